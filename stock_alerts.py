@@ -0,0 +1,183 @@
+# Summary: This module contains price alert rules and the engine that checks them as new daily data arrives.
+#
+# Rules are indexed by symbol ("*" applies to every stock), so each new DailyData only checks the rules for
+# its own stock. A new session is compared with the session before it in the stock's history (a binary
+# search, so the history is not reread). Alerts only fire for the newest session a stock holds; back-filled
+# rows and dates the stock already held are ignored, which is why the ingestion paths add rows oldest first.
+# Rules and triggered alerts are kept in alerts.db, separate from stocks.db so an overwrite save does not
+# drop them.
+
+import sqlite3
+import threading
+from datetime import datetime
+import stock_class
+import stock_metrics
+
+ALERTS_DB = "alerts.db"
+ALL_SYMBOLS = "*"
+RULE_KINDS = {"above": "closes above", "below": "closes below", "move": "moves more than"}
+
+
+class AlertRule:
+    def __init__(self, rule_id, symbol, kind, threshold):
+        self.rule_id = rule_id
+        self.symbol = symbol      # stock symbol or ALL_SYMBOLS
+        self.kind = kind          # "above" or "below" a price, or "move" by more than a percent day over day
+        self.threshold = threshold
+
+    def describe(self):
+        symbol = "Any stock" if self.symbol == ALL_SYMBOLS else self.symbol
+        if self.kind == "move":
+            return f"{symbol} {RULE_KINDS[self.kind]} {self.threshold:g}% day over day"
+        return f"{symbol} {RULE_KINDS[self.kind]} ${self.threshold:,.2f}"
+
+    # Message if the new close triggers this rule, else None. Price rules fire when the close crosses the
+    # threshold, not again on every session it stays beyond it.
+    def check(self, symbol, close, previous):
+        if self.kind == "above":
+            if close > self.threshold and (previous is None or previous <= self.threshold):
+                return f"{symbol} closed at ${close:,.2f}, above ${self.threshold:,.2f}"
+        elif self.kind == "below":
+            if close < self.threshold and (previous is None or previous >= self.threshold):
+                return f"{symbol} closed at ${close:,.2f}, below ${self.threshold:,.2f}"
+        elif previous:
+            change = (close / previous - 1) * 100
+            if abs(change) > self.threshold:
+                return f"{symbol} moved {change:+.2f}% to ${close:,.2f}"
+        return None
+
+
+def create_alert_tables(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS alertRules (
+                            ruleId INTEGER PRIMARY KEY AUTOINCREMENT,
+                            symbol TEXT NOT NULL,
+                            kind TEXT NOT NULL,
+                            threshold REAL NOT NULL
+                        );""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS alerts (
+                            alertId INTEGER PRIMARY KEY AUTOINCREMENT,
+                            ruleId INTEGER NOT NULL,
+                            symbol TEXT NOT NULL,
+                            date TEXT NOT NULL,
+                            close REAL NOT NULL,
+                            message TEXT NOT NULL,
+                            triggered TEXT NOT NULL
+                        );""")
+
+
+def _connect(filename):
+    conn = sqlite3.connect(filename)
+    create_alert_tables(conn.cursor())
+    return conn
+
+
+# Most recent triggered alerts, newest first, as dicts
+def query_alerts(limit=50, filename=ALERTS_DB):
+    conn = _connect(filename)
+    rows = conn.execute("SELECT alertId, ruleId, symbol, date, close, message, triggered FROM alerts ORDER BY alertId DESC LIMIT ?;", (limit,)).fetchall()
+    conn.close()
+    return [{"alert_id": row[0], "rule_id": row[1], "symbol": row[2], "date": row[3], "close": row[4],
+             "message": row[5], "triggered": row[6]} for row in rows]
+
+
+# Alert rules indexed by symbol, evaluated for each new DailyData passed to on_data
+class AlertEngine:
+    def __init__(self, filename=ALERTS_DB):
+        self._filename = filename
+        self._lock = threading.RLock()
+        self._rules = {}    # symbol -> list of AlertRule
+        self._unseen = 0
+        conn = _connect(filename)
+        for row in conn.execute("SELECT ruleId, symbol, kind, threshold FROM alertRules ORDER BY ruleId;"):
+            self._index(AlertRule(*row))
+        conn.close()
+
+    @property
+    def filename(self):
+        return self._filename
+
+    def _index(self, rule):
+        self._rules.setdefault(rule.symbol, []).append(rule)
+
+    def rules(self):
+        with self._lock:
+            return sorted((rule for rules in self._rules.values() for rule in rules), key=lambda x: x.rule_id)
+
+    def rules_for(self, symbol):
+        with self._lock:
+            return self._rules.get(symbol, []) + self._rules.get(ALL_SYMBOLS, [])
+
+    def add_rule(self, symbol, kind, threshold):
+        if kind not in RULE_KINDS:
+            raise ValueError(f"Unknown alert kind {kind}")
+        if threshold <= 0:
+            raise ValueError("Alert threshold must be greater than zero")
+        symbol = symbol.upper()
+        conn = _connect(self._filename)
+        with conn:
+            cur = conn.execute("INSERT INTO alertRules (symbol, kind, threshold) VALUES (?, ?, ?);", (symbol, kind, threshold))
+        conn.close()
+        rule = AlertRule(cur.lastrowid, symbol, kind, threshold)
+        with self._lock:
+            self._index(rule)
+        return rule
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            for symbol, rules in self._rules.items():
+                for rule in rules:
+                    if rule.rule_id == rule_id:
+                        rules.remove(rule)
+                        if len(rules) == 0:
+                            del self._rules[symbol]
+                        conn = _connect(self._filename)
+                        with conn:
+                            conn.execute("DELETE FROM alertRules WHERE ruleId=?;", (rule_id,))
+                        conn.close()
+                        return True
+        return False
+
+    # Number of alerts triggered since mark_seen was last called
+    @property
+    def unseen(self):
+        return self._unseen
+
+    def mark_seen(self):
+        with self._lock:
+            self._unseen = 0
+
+    # Data listener: check the rules for the stock against one new session and record any alerts
+    def on_data(self, stock, daily_data):
+        rules = self.rules_for(stock.symbol)
+        if len(rules) == 0:
+            return []
+        if len(stock.history(daily_data.date, daily_data.date)) > 1:
+            return []  # the stock already held this date (a re-import)
+        if stock.last(1)[0].date > daily_data.date:
+            return []  # back-fill of an older session
+        stock_metrics.incr("alert_rows_checked")
+        previous_data = stock.before(daily_data.date)
+        previous = None if previous_data is None else previous_data.close
+        triggered = datetime.now().isoformat()
+        alerts = []
+        for rule in rules:
+            message = rule.check(stock.symbol, daily_data.close, previous)
+            if message is not None:
+                alerts.append((rule.rule_id, stock.symbol, daily_data.date.strftime("%m/%d/%y"), daily_data.close, message, triggered))
+        if alerts:
+            conn = _connect(self._filename)
+            with conn:
+                conn.executemany("INSERT INTO alerts (ruleId, symbol, date, close, message, triggered) VALUES (?, ?, ?, ?, ?, ?);", alerts)
+            conn.close()
+            with self._lock:
+                self._unseen += len(alerts)
+            stock_metrics.incr("alerts_triggered", len(alerts))
+        return [alert[4] for alert in alerts]
+
+    # Start checking every DailyData added to any Stock
+    def attach(self):
+        stock_class.add_data_listener(self.on_data)
+
+    def detach(self):
+        stock_class.remove_data_listener(self.on_data)
+
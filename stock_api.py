@@ -0,0 +1,232 @@
+# Summary: This module contains a small read-only HTTP service for stocks, quotes, price history and the portfolio report.
+#
+# Endpoints (all GET, JSON):
+#   /stocks                     symbols, names and shares
+#   /quotes                     latest close for every stock
+#   /quotes/<SYMBOL>            latest close for one stock
+#   /history/<SYMBOL>           price history; ?start=mm/dd/yy&end=mm/dd/yy or ?sessions=N,
+#                               ?period=weekly|monthly for precomputed bars
+#   /report                     the same figures as the console report plus portfolio total
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import stock_data
+import stock_metrics
+from utilities import report_summary
+
+
+class NotFound(Exception):
+    pass
+
+
+# In-memory response cache, cleared when data is saved in this process or stocks.db changes on disk.
+# Every clear starts a new generation; a response built during an older generation is not stored.
+class ResponseCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self._generation = 0
+
+    # Changes whenever another process writes to the database (WAL file included)
+    def _file_version(self):
+        version = []
+        for filename in ("stocks.db", "stocks.db-wal"):
+            try:
+                info = os.stat(filename)
+                version.append((info.st_mtime_ns, info.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    # Returns (entry or None, generation); pass the generation to put() with the response built on a miss
+    def get(self, key):
+        version = self._file_version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                self._generation += 1
+            return self._entries.get(key), self._generation
+
+    def put(self, key, entry, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = entry
+            else:
+                stock_metrics.incr("api_cache_stale_puts")
+
+
+def parse_date(text):
+    try:
+        return datetime.strptime(text, "%m/%d/%y")
+    except ValueError:
+        raise ValueError(f"Invalid date {text}. Please use mm/dd/yy format.")
+
+
+def quote(symbol):
+    history = stock_data.query_stock_data(symbol, sessions=1, read_only=True)
+    if len(history) == 0:
+        return {"symbol": symbol, "date": None, "close": None, "volume": None}
+    return {"symbol": symbol, "date": history[0].date.strftime("%Y-%m-%d"),
+            "close": history[0].close, "volume": history[0].volume}
+
+
+def find_stock(symbol):
+    for stock in stock_data.query_stocks(read_only=True):
+        if stock.symbol == symbol:
+            return stock
+    raise NotFound(f"Stock symbol {symbol} not found in list.")
+
+
+def get_stocks(query):
+    return [{"symbol": stock.symbol, "name": stock.name, "shares": stock.shares}
+            for stock in stock_data.query_stocks(read_only=True)]
+
+
+def get_quotes(query, symbol=None):
+    if symbol is not None:
+        return quote(find_stock(symbol).symbol)
+    return [quote(stock.symbol) for stock in stock_data.query_stocks(read_only=True)]
+
+
+def history_row(daily_data):
+    return {"date": daily_data.date.strftime("%Y-%m-%d"), "open": daily_data.open, "high": daily_data.high,
+            "low": daily_data.low, "close": daily_data.close, "adj_close": daily_data.adj_close, "volume": daily_data.volume}
+
+
+def get_history(query, symbol):
+    stock = find_stock(symbol)
+    start = parse_date(query["start"][0]) if "start" in query else None
+    end = parse_date(query["end"][0]) if "end" in query else None
+    period = query["period"][0] if "period" in query else "daily"
+    if period == "daily":
+        sessions = int(query["sessions"][0]) if "sessions" in query else None
+        history = stock_data.query_stock_data(stock.symbol, start, end, sessions, read_only=True)
+    else:
+        history = stock_data.query_rollup(stock.symbol, period, start, end, read_only=True)
+    return {"symbol": stock.symbol, "period": period, "history": [history_row(d) for d in history]}
+
+
+def get_report(query):
+    rows = []
+    for stock in stock_data.query_stocks(read_only=True):
+        # the report only needs the two most recent sessions
+        for daily_data in stock_data.query_stock_data(stock.symbol, sessions=2, read_only=True):
+            stock.add_data(daily_data, notify=False)
+        rows.append(report_summary(stock))
+    return {"stocks": rows, "total_market_value": sum(row["market_value"] for row in rows)}
+
+
+ROUTES = {
+    ("stocks",): get_stocks,
+    ("quotes",): get_quotes,
+    ("report",): get_report,
+}
+SYMBOL_ROUTES = {
+    "quotes": get_quotes,
+    "history": get_history,
+}
+
+
+class StockAPIHandler(BaseHTTPRequestHandler):
+    server_version = "StockAPI/1.0"
+    cache = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def route(self, parts, query):
+        if tuple(parts) in ROUTES:
+            return ROUTES[tuple(parts)](query)
+        if len(parts) == 2 and parts[0] in SYMBOL_ROUTES:
+            return SYMBOL_ROUTES[parts[0]](query, parts[1].upper())
+        raise NotFound(f"No such endpoint: /{'/'.join(parts)}")
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        key = url.path.rstrip("/") + "?" + url.query
+        entry, generation = self.cache.get(key)
+        if entry is None:
+            stock_metrics.incr("api_cache_misses")
+            parts = [part for part in url.path.split("/") if part]
+            try:
+                with stock_metrics.span("api_" + (parts[0] if parts else "root")):
+                    result = self.route(parts, parse_qs(url.query))
+            except NotFound as e:
+                self.send_error_json(404, str(e))
+                return
+            except ValueError as e:
+                self.send_error_json(400, str(e))
+                return
+            except Exception as e:
+                self.send_error_json(500, str(e))
+                return
+            body = json.dumps(result).encode("utf-8")
+            entry = ('"' + hashlib.sha1(body).hexdigest() + '"', body)
+            self.cache.put(key, entry, generation)
+        else:
+            stock_metrics.incr("api_cache_hits")
+        etag, body = entry
+        if self.headers.get("If-None-Match") == etag:
+            stock_metrics.incr("api_not_modified")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_json(200, body, etag)
+
+    do_HEAD = do_GET
+
+
+# Create (but do not start) the HTTP server for the stocks.db in the working directory
+def create_server(host="127.0.0.1", port=8200):
+    stock_data.create_database()  # creates the database or adds any missing tables and indexes
+    stock_data.enable_wal()
+    cache = ResponseCache()
+    stock_data.add_save_listener(cache.invalidate)
+    handler = type("Handler", (StockAPIHandler,), {"cache": cache})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stock data over HTTP (read-only).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    args = parser.parse_args()
+    server = create_server(args.host, args.port)
+    print(f"Serving stock data on http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == "__main__":
+    # execute only if run as a stand-alone script
+    main()
@@ -0,0 +1,242 @@
+# Summary: This module contains a vectorized backtesting engine that runs trading rules over the stored price histories.
+#
+# Histories are lined up into (sessions x symbols) numpy arrays. Signal functions turn those arrays into
+# target portfolio weights for every session and symbol at once, and simulate() trades toward the targets
+# with share-based accounting and transaction costs. sweep() runs a parameter grid over a process pool.
+
+import argparse
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import stock_data
+
+TRADING_DAYS = 252
+
+
+# Date-aligned close and volume arrays built from Stock histories
+class MarketData:
+    def __init__(self, dates, symbols, close, volume):
+        self.dates = dates        # list of datetimes, oldest to newest
+        self.symbols = symbols    # list of symbols, one per column
+        self.close = close        # float array (sessions x symbols), forward filled, NaN before first price
+        self.volume = volume      # float array (sessions x symbols), 0 where there was no data
+
+    @property
+    def sessions(self):
+        return len(self.dates)
+
+
+# Line up the histories of stock_list on the union of their dates
+def build_market_data(stock_list):
+    stocks = [stock for stock in stock_list if len(stock.DataList) > 0]
+    dates = sorted({daily_data.date for stock in stocks for daily_data in stock.DataList})
+    row = {date: i for i, date in enumerate(dates)}
+    close = np.full((len(dates), len(stocks)), np.nan)
+    volume = np.zeros((len(dates), len(stocks)))
+    for j, stock in enumerate(stocks):
+        for daily_data in stock.history():
+            close[row[daily_data.date], j] = daily_data.close
+            volume[row[daily_data.date], j] = daily_data.volume
+    return MarketData(dates, [stock.symbol for stock in stocks], forward_fill(close), volume)
+
+
+# Carry the last known price forward over missing sessions (column by column, no Python loop over rows)
+def forward_fill(values):
+    mask = np.isnan(values)
+    index = np.where(~mask, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])]
+
+
+# Simple moving average over sessions for every column; NaN until window sessions are available
+def moving_average(values, window):
+    if window < 1:
+        raise ValueError("moving average window must be at least 1")
+    result = np.full(values.shape, np.nan)
+    if window > values.shape[0]:
+        return result
+    cumulative = np.cumsum(np.nan_to_num(values), axis=0)
+    counts = np.cumsum(~np.isnan(values), axis=0)
+    sums = cumulative[window - 1:] - np.vstack([np.zeros((1, values.shape[1])), cumulative[:-window]])
+    valid = counts[window - 1:] - np.vstack([np.zeros((1, values.shape[1])), counts[:-window]])
+    result[window - 1:] = np.where(valid == window, sums / np.maximum(valid, 1), np.nan)
+    return result
+
+
+def _normalize(signal):
+    signal = np.nan_to_num(signal)
+    totals = signal.sum(axis=1, keepdims=True)
+    return np.divide(signal, totals, out=np.zeros_like(signal), where=totals > 0)
+
+
+# Hold (equal weighted) every stock whose fast moving average is above its slow moving average
+def ma_crossover(data, fast=20, slow=50):
+    fast_ma = moving_average(data.close, fast)
+    slow_ma = moving_average(data.close, slow)
+    return _normalize((fast_ma > slow_ma).astype(float))
+
+
+# Hold every stock with a price at equal weight, rebalancing every `every` sessions
+def equal_weight(data, every=21):
+    if every < 1:
+        raise ValueError("equal_weight needs every >= 1")
+    weights = _normalize((~np.isnan(data.close)).astype(float))
+    keep = np.arange(data.sessions) % every == 0
+    index = np.maximum.accumulate(np.where(keep, np.arange(data.sessions), 0))
+    return weights[index]
+
+
+# Hold the top `top` stocks by return over `lookback` sessions at equal weight
+def momentum(data, lookback=60, top=1):
+    if lookback < 1 or top < 1:
+        raise ValueError("momentum needs lookback >= 1 and top >= 1")
+    past = np.vstack([np.full((lookback, data.close.shape[1]), np.nan), data.close[:-lookback]]) if lookback < data.sessions else np.full(data.close.shape, np.nan)
+    returns = np.where(np.isnan(past), -np.inf, data.close / past - 1)
+    ranks = np.argsort(np.argsort(-returns, axis=1), axis=1)
+    return _normalize(((ranks < top) & np.isfinite(returns)).astype(float))
+
+
+SIGNALS = {"ma_crossover": ma_crossover, "equal_weight": equal_weight, "momentum": momentum}
+
+
+# Commission for trading delta shares at prices
+def _trade_cost(delta, prices, cost_bps, cost_per_share):
+    return float(np.abs(delta) @ prices * cost_bps / 10000 + np.abs(delta).sum() * cost_per_share)
+
+
+# Trade toward target weights. Weights decided on one session are traded at the next session's close.
+# A holding is only traded when its target changes or it drifts more than band away from the target.
+def simulate(data, weights, cash=100000.0, cost_bps=10.0, cost_per_share=0.0, whole_shares=True, band=0.05):
+    sessions, count = data.close.shape
+    prices = np.nan_to_num(data.close)
+    shares = np.zeros(count)
+    positions = np.zeros((sessions, count))
+    equity = np.zeros(sessions)
+    costs = 0.0
+    trades = 0
+    target = np.vstack([np.zeros((1, count)), weights[:-1]])  # no look-ahead
+    for t in range(sessions):
+        value = cash + shares @ prices[t]
+        tradable = prices[t] > 0
+        safe_prices = np.where(tradable, prices[t], 1)
+        current = shares * prices[t] / value if value > 0 else np.zeros(count)
+        rebalance = tradable & ((target[t] != target[t - 1]) | (np.abs(current - target[t]) > band)) if t > 0 else tradable
+        # size orders from the value left after paying for them, so costs never push cash below zero
+        full = np.where(rebalance, target[t] * value / safe_prices - shares, 0)
+        net_value = value - _trade_cost(full, prices[t], cost_bps, cost_per_share)
+        wanted = np.where(rebalance, target[t] * max(net_value, 0) / safe_prices, shares)
+        if whole_shares:
+            wanted = np.where(rebalance, np.floor(wanted), shares)
+        delta = wanted - shares
+        buys = delta > 0
+        spend = delta[buys] @ prices[t][buys] + _trade_cost(delta[buys], prices[t][buys], cost_bps, cost_per_share)
+        proceeds = -delta[~buys] @ prices[t][~buys] - _trade_cost(delta[~buys], prices[t][~buys], cost_bps, cost_per_share)
+        if spend > cash + proceeds:
+            # rounding or per-share costs left the buys slightly short of cash; scale them down
+            delta[buys] *= max(cash + proceeds, 0) / spend
+            if whole_shares:
+                delta[buys] = np.floor(delta[buys])
+            wanted = shares + delta
+        traded = np.abs(delta) > 1e-9
+        if traded.any():
+            cost = _trade_cost(delta, prices[t], cost_bps, cost_per_share)
+            cash -= delta @ prices[t] + cost
+            costs += cost
+            trades += int(traded.sum())
+            shares = wanted
+        positions[t] = shares
+        equity[t] = cash + shares @ prices[t]
+    return BacktestResult(data, positions, equity, costs, trades)
+
+
+class BacktestResult:
+    def __init__(self, data, positions, equity, costs, trades):
+        self.data = data
+        self.positions = positions  # shares held per session and symbol
+        self.equity = equity        # portfolio value per session
+        self.costs = costs
+        self.trades = trades
+
+    def summary(self):
+        if len(self.equity) == 0 or self.equity[0] <= 0:
+            return {"total_return": 0.0, "cagr": 0.0, "max_drawdown": 0.0, "sharpe": 0.0, "trades": self.trades, "costs": self.costs}
+        total_return = self.equity[-1] / self.equity[0] - 1
+        years = len(self.equity) / TRADING_DAYS
+        cagr = (self.equity[-1] / self.equity[0]) ** (1 / years) - 1 if years > 0 and self.equity[-1] > 0 else -1.0
+        peaks = np.maximum.accumulate(self.equity)
+        max_drawdown = float(np.max(1 - self.equity / peaks))
+        daily = np.diff(self.equity) / self.equity[:-1]
+        sharpe = float(daily.mean() / daily.std() * math.sqrt(TRADING_DAYS)) if len(daily) > 1 and daily.std() > 0 else 0.0
+        return {"total_return": float(total_return), "cagr": float(cagr), "max_drawdown": max_drawdown,
+                "sharpe": sharpe, "trades": self.trades, "costs": float(self.costs)}
+
+
+# Run one signal with one set of parameters and return its summary
+def run_backtest(data, signal, params, **simulate_args):
+    weights = SIGNALS[signal](data, **params) if isinstance(signal, str) else signal(data, **params)
+    return simulate(data, weights, **simulate_args).summary()
+
+
+_worker_data = None
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+def _run_in_worker(signal, params, simulate_args):
+    return params, run_backtest(_worker_data, signal, params, **simulate_args)
+
+
+# Every combination of the values in grid, e.g. {"fast": [10, 20], "slow": [50, 100]}
+def parameter_grid(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# Run signal over every parameter combination in a process pool; signal must be a name in SIGNALS
+# or a module-level function so it can be sent to the worker processes
+def sweep(data, signal, grid, workers=None, **simulate_args):
+    combos = parameter_grid(grid)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        futures = [pool.submit(_run_in_worker, signal, params, simulate_args) for params in combos]
+        return [future.result() for future in futures]
+
+
+def parse_grid(items):
+    grid = {}
+    for item in items:
+        name, values = item.split("=")
+        grid[name] = [int(value) if value.lstrip("-").isdigit() else float(value) for value in values.split(",")]
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest a trading rule over the price histories in stocks.db.")
+    parser.add_argument("signal", choices=sorted(SIGNALS))
+    parser.add_argument("--param", action="append", default=[], help="NAME=V1,V2,... (repeat for each parameter)")
+    parser.add_argument("--cash", type=float, default=100000.0)
+    parser.add_argument("--cost-bps", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    stock_list = []
+    stock_data.load_stock_data(stock_list, read_only=True)
+    data = build_market_data(stock_list)
+    if data.sessions == 0:
+        print("No price history in stocks.db.")
+        return
+    try:
+        results = sweep(data, args.signal, parse_grid(args.param), args.workers, cash=args.cash, cost_bps=args.cost_bps)
+    except ValueError as e:
+        parser.error(str(e))
+    results.sort(key=lambda r: r[1]["sharpe"], reverse=True)
+    print(f"{args.signal}: {len(data.symbols)} stocks, {data.sessions} sessions")
+    print("PARAMS\t\t\tRETURN\tCAGR\tMAX DD\tSHARPE\tTRADES")
+    for params, summary in results:
+        label = ", ".join(f"{k}={v}" for k, v in params.items()) or "(defaults)"
+        print(f"{label:<24}{summary['total_return']*100:7.2f}%\t{summary['cagr']*100:.2f}%\t{summary['max_drawdown']*100:.2f}%\t{summary['sharpe']:.2f}\t{summary['trades']}")
+
+if __name__ == "__main__":
+    # execute only if run as a stand-alone script
+    main()
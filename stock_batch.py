@@ -0,0 +1,302 @@
+# Summary: This module contains the non-interactive batch commands (import, fetch, save, report, export, chart, alerts) used by stocks.py.
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+from datetime import datetime
+import stock_alerts
+import stock_data
+import stock_report
+from stock_class import Stock, add_data_listener, remove_data_listener
+from utilities import report_summary
+
+# Exit status codes
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_NOT_FOUND = 3
+EXIT_DATA_ERROR = 4
+
+
+class BatchError(Exception):
+    def __init__(self, message, status=EXIT_ERROR):
+        super().__init__(message)
+        self.status = status
+
+
+# Writes results either as plain text or as one JSON object per line
+class Output:
+    def __init__(self, as_json, stream=None):
+        self._as_json = as_json
+        self._stream = stream if stream is not None else sys.stdout
+
+    def emit(self, event, text, **fields):
+        if self._as_json:
+            self._stream.write(json.dumps({"event": event, **fields}) + "\n")
+        else:
+            self._stream.write(text + "\n")
+        self._stream.flush()
+
+    # Errors go to stderr in text mode so they never mix with results
+    def error(self, message, status):
+        if self._as_json:
+            self.emit("error", message, message=message, status=status)
+        else:
+            sys.stderr.write(f"Error: {message}\n")
+
+
+def load_stocks():
+    if os.path.exists("stocks.db") == False:
+        stock_data.create_database()
+    stock_list = []
+    stock_data.load_stock_data(stock_list)
+    return stock_list
+
+
+def find_stock(stock_list, symbol):
+    for stock in stock_list:
+        if stock.symbol == symbol:
+            return stock
+    raise BatchError(f"Stock symbol {symbol} not found in list.", EXIT_NOT_FOUND)
+
+
+def parse_date(text):
+    try:
+        datetime.strptime(text, "%m/%d/%y")
+    except ValueError:
+        raise BatchError(f"Invalid date {text}. Please use mm/dd/yy format.", EXIT_USAGE)
+    return text
+
+
+def parse_optional_date(text):
+    return None if text is None else datetime.strptime(parse_date(text), "%m/%d/%y")
+
+
+# Check alert rules against rows added while the block runs and emit the alerts that fire
+@contextlib.contextmanager
+def checking_alerts(out):
+    engine = stock_alerts.AlertEngine()
+    def listener(stock, daily_data):
+        for message in engine.on_data(stock, daily_data):
+            out.emit("alert", f"Alert: {message}", symbol=stock.symbol, date=daily_data.date.strftime("%m/%d/%y"), message=message)
+    add_data_listener(listener)
+    try:
+        yield engine
+    finally:
+        remove_data_listener(listener)
+
+
+# Import a Yahoo! Finance CSV for one stock and save it
+def cmd_import(args, out):
+    stock_list = load_stocks()
+    symbol = args.symbol.upper()
+    if not os.path.exists(args.filename):
+        raise BatchError(f"File not found: {args.filename}", EXIT_NOT_FOUND)
+    stock = find_stock(stock_list, symbol)
+    try:
+        # keep skipped-row messages out of the result stream
+        with contextlib.redirect_stdout(sys.stderr), checking_alerts(out):
+            stock_data.import_stock_web_csv(stock_list, symbol, args.filename)
+    except (OSError, ValueError) as e:
+        raise BatchError(f"Error importing CSV: {e}", EXIT_DATA_ERROR)
+    # count the rows the database did not already have, not the rows read from the file
+    count = stock_data.save_stock_data([stock])
+    out.emit("import", f"Imported {count} records for {symbol}.", symbol=symbol, records=count, filename=args.filename)
+
+
+# Retrieve price history from the web for one or all stocks and save it
+def cmd_fetch(args, out):
+    start = parse_date(args.start)
+    end = parse_date(args.end)
+    stock_list = load_stocks()
+    symbol = args.symbol.upper()
+    selected = stock_list if symbol == "ALL" else [find_stock(stock_list, symbol)]
+    total = 0
+    for stock in selected:
+        try:
+            with checking_alerts(out):
+                count = stock_data.retrieve_stock_web(start, end, [stock])
+        except Exception as e:
+            raise BatchError(f"Error retrieving data for {stock.symbol}: {e}", EXIT_DATA_ERROR)
+        stock_data.save_stock_data([stock])
+        total += count
+        out.emit("fetch", f"Retrieved {count} records for {stock.symbol}.", symbol=stock.symbol, records=count)
+    out.emit("fetch_done", f"Retrieved {total} records.", records=total)
+
+
+# Add stocks and write the current data to the database
+def cmd_save(args, out):
+    stock_list = load_stocks()
+    for symbol, name, shares in args.stock or []:
+        symbol = symbol.upper()
+        if any(stock.symbol == symbol for stock in stock_list):
+            raise BatchError(f"Stock symbol {symbol} already exists in list.", EXIT_USAGE)
+        try:
+            stock_list.append(Stock(symbol, name, float(shares)))
+        except ValueError:
+            raise BatchError(f"Invalid number of shares for {symbol}: {shares}", EXIT_USAGE)
+        out.emit("add", f"Stock {symbol} ({name}) with {shares} added to list.", symbol=symbol, name=name, shares=float(shares))
+    stock_data.save_stock_data(stock_list, overwrite=args.overwrite, storage=args.storage)
+    out.emit("save", f"Saved {len(stock_list)} stocks to database.", stocks=len(stock_list), overwrite=args.overwrite)
+
+
+def cmd_report(args, out):
+    stock_list = load_stocks()
+    if args.symbol:
+        stock_list = [find_stock(stock_list, symbol.upper()) for symbol in args.symbol]
+    for stock in stock_list:
+        row = report_summary(stock)
+        text = f"{row['symbol']}\t{row['name']}\t{row['shares']}\t{row['current']:.2f}\t{row['market_value']:.2f}"
+        if "change" in row:
+            text += f"\t{row['change']:.2f} ({row['percent']:.2f}%)"
+        out.emit("report", text, **row)
+
+
+# Stream report rows from the database to a file (or stdout) as CSV, JSON Lines or text
+def cmd_export(args, out):
+    if os.path.exists("stocks.db") == False:
+        raise BatchError("Database stocks.db not found.", EXIT_NOT_FOUND)
+    symbols = {symbol.upper() for symbol in args.symbol} if args.symbol else None
+    rows = stock_report.iter_database_rows(symbols, parse_optional_date(args.start), parse_optional_date(args.end))
+    if args.output:
+        with open(args.output, "w", newline='') as stream:
+            count = stock_report.export_report(rows, stream, args.format)
+        out.emit("export", f"Exported {count} rows to {args.output}.", rows=count, filename=args.output, format=args.format)
+    else:
+        stock_report.export_report(rows, sys.stdout, args.format)
+
+
+# Render the chart for one stock to an image file
+def cmd_chart(args, out):
+    import matplotlib.pyplot as plt
+    plt.switch_backend("Agg")
+    from utilities import display_stock_chart
+    stock_list = load_stocks()
+    symbol = args.symbol.upper()
+    stock = find_stock(stock_list, symbol)
+    if args.period != "daily":
+        # chart the precomputed bars instead of every daily row
+        bars = Stock(stock.symbol, stock.name, stock.shares)
+        for bar in stock_data.query_rollup(symbol, args.period):
+            bars.add_data(bar, notify=False)
+        stock = bars
+    if len(stock.DataList) == 0:
+        raise BatchError(f"No data available for {symbol}", EXIT_DATA_ERROR)
+    filename = args.output or f"{symbol}.png"
+    display_stock_chart([stock], symbol, sessions=args.sessions)
+    plt.gcf().savefig(filename)
+    plt.close("all")
+    out.emit("chart", f"Chart for {symbol} saved to {filename}.", symbol=symbol, filename=filename)
+
+
+# List, add or remove price alert rules, or show triggered alerts
+def cmd_alerts(args, out):
+    engine = stock_alerts.AlertEngine()
+    if args.alert_command == "add":
+        try:
+            rule = engine.add_rule(args.symbol, args.kind, args.threshold)
+        except ValueError as e:
+            raise BatchError(str(e), EXIT_USAGE)
+        out.emit("alert_rule", f"Alert #{rule.rule_id} added: {rule.describe()}.", rule_id=rule.rule_id,
+                 symbol=rule.symbol, kind=rule.kind, threshold=rule.threshold)
+    elif args.alert_command == "remove":
+        if not engine.remove_rule(args.rule_id):
+            raise BatchError(f"Alert rule #{args.rule_id} not found.", EXIT_NOT_FOUND)
+        out.emit("alert_rule_removed", f"Alert rule #{args.rule_id} deleted.", rule_id=args.rule_id)
+    elif args.alert_command == "log":
+        for alert in stock_alerts.query_alerts(args.limit):
+            out.emit("alert", f"{alert['date']}\t{alert['message']}", **alert)
+    else:
+        for rule in engine.rules():
+            out.emit("alert_rule", f"#{rule.rule_id}\t{rule.describe()}", rule_id=rule.rule_id,
+                     symbol=rule.symbol, kind=rule.kind, threshold=rule.threshold)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="stocks.py", description="Run stock manager tasks without the interactive menu.")
+    parser.add_argument("--json", action="store_true", help="write results as JSON lines")
+    parser.add_argument("--portfolio", default=None, help="directory holding the stocks.db to use")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="import a Yahoo! Finance CSV file")
+    import_parser.add_argument("symbol")
+    import_parser.add_argument("filename")
+    import_parser.set_defaults(func=cmd_import)
+
+    fetch_parser = subparsers.add_parser("fetch", help="retrieve price history from the web")
+    fetch_parser.add_argument("symbol", help="stock symbol or ALL")
+    fetch_parser.add_argument("--start", required=True, help="start date (mm/dd/yy)")
+    fetch_parser.add_argument("--end", required=True, help="end date (mm/dd/yy)")
+    fetch_parser.set_defaults(func=cmd_fetch)
+
+    save_parser = subparsers.add_parser("save", help="add stocks and save to the database")
+    save_parser.add_argument("--stock", nargs=3, action="append", metavar=("SYMBOL", "NAME", "SHARES"))
+    save_parser.add_argument("--overwrite", action="store_true")
+    save_parser.add_argument("--storage", choices=["rows", "blocks"], default=None, help="daily data storage mode (default STOCK_STORAGE or rows)")
+    save_parser.set_defaults(func=cmd_save)
+
+    report_parser = subparsers.add_parser("report", help="print the stock report")
+    report_parser.add_argument("symbol", nargs="*")
+    report_parser.set_defaults(func=cmd_report)
+
+    export_parser = subparsers.add_parser("export", help="stream report rows to CSV, JSON Lines or text")
+    export_parser.add_argument("symbol", nargs="*")
+    export_parser.add_argument("--format", choices=sorted(stock_report.WRITERS), default="csv")
+    export_parser.add_argument("--output", default=None, help="file to write (default stdout)")
+    export_parser.add_argument("--start", default=None, help="start date (mm/dd/yy)")
+    export_parser.add_argument("--end", default=None, help="end date (mm/dd/yy)")
+    export_parser.set_defaults(func=cmd_export)
+
+    chart_parser = subparsers.add_parser("chart", help="save a stock chart image")
+    chart_parser.add_argument("symbol")
+    chart_parser.add_argument("--output", default=None, help="image file (default SYMBOL.png)")
+    chart_parser.add_argument("--sessions", type=int, default=None, help="only chart the most recent sessions")
+    chart_parser.add_argument("--period", choices=["daily", "weekly", "monthly"], default="daily", help="chart daily data or weekly/monthly bars")
+    chart_parser.set_defaults(func=cmd_chart)
+
+    alerts_parser = subparsers.add_parser("alerts", help="manage price alert rules and show triggered alerts")
+    alert_commands = alerts_parser.add_subparsers(dest="alert_command")
+    alert_commands.add_parser("list", help="list alert rules")
+    add_parser = alert_commands.add_parser("add", help="add an alert rule")
+    add_parser.add_argument("symbol", help="stock symbol or * for every stock")
+    add_parser.add_argument("kind", choices=sorted(stock_alerts.RULE_KINDS), help="close above/below a price, or move by more than a percent")
+    add_parser.add_argument("threshold", type=float, help="price, or percent for move")
+    remove_parser = alert_commands.add_parser("remove", help="delete an alert rule")
+    remove_parser.add_argument("rule_id", type=int)
+    log_parser = alert_commands.add_parser("log", help="show the most recent triggered alerts")
+    log_parser.add_argument("--limit", type=int, default=50)
+    alerts_parser.set_defaults(func=cmd_alerts)
+    return parser
+
+
+# Make file arguments absolute so they still name the caller's files after --portfolio changes directory
+def resolve_paths(args):
+    if args.command == "chart" and args.output is None:
+        args.output = f"{args.symbol.upper()}.png"
+    for name in ("filename", "output"):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+
+# Run one batch command and return the exit status
+def main(argv=None):
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return e.code
+    out = Output(args.json)
+    try:
+        if args.portfolio:
+            resolve_paths(args)
+            os.chdir(args.portfolio)
+        args.func(args, out)
+    except BatchError as e:
+        out.error(str(e), e.status)
+        return e.status
+    except Exception as e:
+        out.error(str(e), EXIT_ERROR)
+        return EXIT_ERROR
+    return EXIT_OK
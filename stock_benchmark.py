@@ -0,0 +1,180 @@
+# Summary: This module contains a benchmark suite that times the storage, import, report and chart paths using synthetic stock data.
+
+import argparse
+import builtins
+import contextlib
+import csv
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import stock_console
+import stock_data
+import utilities
+from stock_class import Stock, DailyData
+
+DEFAULT_SCALES = "1x250,5x1000,10x2500"
+
+
+# Build a deterministic list of stocks with days trading days of random walk prices
+def generate_stocks(symbols, days, seed=200):
+    rng = random.Random(seed)
+    start = datetime(2000, 1, 3)
+    trading_days = []
+    day = start
+    while len(trading_days) < days:
+        if day.weekday() < 5:
+            trading_days.append(day)
+        day = day + timedelta(days=1)
+    stock_list = []
+    for i in range(symbols):
+        stock = Stock(f"S{i:04d}", f"Synthetic Company {i}", float(rng.randint(1, 1000)))
+        price = rng.uniform(10, 500)
+        for date in trading_days:
+            price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+            stock.add_data(DailyData(date, round(price, 2), float(rng.randint(100000, 50000000))))
+        stock_list.append(stock)
+    return stock_list
+
+
+# Write a stock's history in Yahoo! Finance CSV layout (newest first)
+def write_yahoo_csv(stock, filename):
+    with open(filename, "w", newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Date", "Open", "High", "Low", "Close", "Adj Close", "Volume"])
+        for data in reversed(stock.DataList):
+            writer.writerow([data.date.strftime("%Y-%m-%d"), data.close, data.close, data.close, data.close, data.close, int(data.volume)])
+
+
+# Run func repeat times and return the fastest wall clock time
+def best_time(func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# Send console output to a null sink and skip screen clears and prompts
+@contextlib.contextmanager
+def quiet_console():
+    saved_input = builtins.input
+    saved_clear = stock_console.clear_screen
+    builtins.input = lambda prompt="": ""
+    stock_console.clear_screen = lambda: None
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = saved_input
+        stock_console.clear_screen = saved_clear
+
+
+def bench_scale(symbols, days, repeat, seed, storage=None):
+    stock_list = generate_stocks(symbols, days, seed)
+    rows = symbols * days
+    results = {}
+
+    def reset_database():
+        if os.path.exists("stocks.db"):
+            os.remove("stocks.db")
+        stock_data.create_database()
+
+    results["save_stock_data"] = best_time(lambda: stock_data.save_stock_data(stock_list, storage=storage), repeat, reset_database)
+
+    loaded = []
+    results["load_stock_data"] = best_time(lambda: stock_data.load_stock_data(loaded), repeat)
+
+    write_yahoo_csv(stock_list[0], "import.csv")
+    import_list = []
+    def reset_import():
+        import_list.clear()
+        import_list.append(Stock(stock_list[0].symbol, stock_list[0].name, 0))
+    with quiet_console():
+        results["import_stock_web_csv"] = best_time(lambda: stock_data.import_stock_web_csv(import_list, import_list[0].symbol, "import.csv"), repeat, reset_import)
+
+    with quiet_console():
+        results["display_report"] = best_time(lambda: stock_console.display_report(stock_list), repeat)
+
+    def render_chart():
+        with quiet_console():
+            utilities.display_stock_chart(stock_list, stock_list[0].symbol)
+        plt.close("all")
+    results["display_stock_chart"] = best_time(render_chart, repeat)
+
+    return [{"benchmark": name, "symbols": symbols, "days": days,
+             "rows": days if name in ("import_stock_web_csv", "display_stock_chart") else rows,
+             "seconds": seconds} for name, seconds in results.items()]
+
+
+def parse_scales(text):
+    scales = []
+    for item in text.split(","):
+        symbols, days = item.lower().split("x")
+        scales.append((int(symbols), int(days)))
+    return scales
+
+
+# Print how each benchmark compares with a previous results file
+def compare_results(current, previous_file):
+    with open(previous_file) as f:
+        previous = json.load(f)
+    baseline = {(r["benchmark"], r["symbols"], r["days"]): r["seconds"] for r in previous["results"]}
+    print(f"\nCompared with {previous_file} ({previous.get('timestamp', '?')}):")
+    for r in current["results"]:
+        key = (r["benchmark"], r["symbols"], r["days"])
+        if key in baseline and baseline[key] > 0:
+            ratio = r["seconds"] / baseline[key]
+            print(f"{r['benchmark']:<22}{r['symbols']:>6}x{r['days']:<6}{baseline[key]:>10.4f}s -> {r['seconds']:.4f}s ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stock data storage, import, report and chart functions.")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="comma separated SYMBOLSxDAYS list")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=200)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="previous results file to compare against")
+    parser.add_argument("--storage", choices=["rows", "blocks"], default=None, help="daily data storage mode")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    compare = os.path.abspath(args.compare) if args.compare else None
+    report = {"timestamp": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(),
+              "platform": platform.platform(),
+              "repeat": args.repeat,
+              "seed": args.seed,
+              "storage": args.storage or stock_data.STORAGE_MODE,
+              "results": []}
+
+    # stock_data always uses stocks.db in the working directory, so run in a scratch folder
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            for symbols, days in parse_scales(args.scales):
+                for r in bench_scale(symbols, days, args.repeat, args.seed, args.storage):
+                    report["results"].append(r)
+                    print(f"{r['benchmark']:<22}{symbols:>6}x{days:<6}{r['seconds']:>10.4f}s")
+        finally:
+            os.chdir(cwd)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    if compare:
+        compare_results(report, compare)
+
+if __name__ == "__main__":
+    # execute only if run as a stand-alone script
+    main()
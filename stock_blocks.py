@@ -0,0 +1,80 @@
+# Summary: This module packs a year of daily stock data into a compressed block and unpacks it again.
+# Block layout before zlib: row count and first day (ordinal), day deltas, closes, volumes,
+# then optionally opens, highs, lows and adjusted closes (NaN where unknown).
+
+import math
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime
+from stock_class import DailyData
+
+HEADER = struct.Struct("<Ii")
+NAN = float("nan")
+
+
+def _to_bytes(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+# Compress a date-sorted list of DailyData into a BLOB
+def encode_block(data_list, level=6):
+    count = len(data_list)
+    if count == 0:
+        return zlib.compress(HEADER.pack(0, 0), level)
+    ordinals = [data.date.toordinal() for data in data_list]
+    deltas = array("i", (ordinals[i] - ordinals[i - 1] for i in range(1, count)))
+    closes = array("d", (data.close for data in data_list))
+    volumes = array("d", (data.volume for data in data_list))
+    raw = HEADER.pack(count, ordinals[0]) + _to_bytes(deltas) + _to_bytes(closes) + _to_bytes(volumes)
+    if any(data.open is not None or data.high is not None or data.low is not None or data.adj_close is not None for data in data_list):
+        for field in ("open", "high", "low", "adj_close"):
+            values = (getattr(data, field) for data in data_list)
+            raw += _to_bytes(array("d", (NAN if value is None else value for value in values)))
+    return zlib.compress(raw, level)
+
+
+def _optional(value):
+    return None if math.isnan(value) else value
+
+
+# Decompress a BLOB made by encode_block back into a list of DailyData (oldest to newest)
+def decode_block(blob):
+    raw = zlib.decompress(blob)
+    count, first = HEADER.unpack_from(raw)
+    if count == 0:
+        return []
+    offset = HEADER.size
+    deltas = _from_bytes("i", raw[offset:offset + 4 * (count - 1)])
+    offset += 4 * (count - 1)
+    closes = _from_bytes("d", raw[offset:offset + 8 * count])
+    offset += 8 * count
+    volumes = _from_bytes("d", raw[offset:offset + 8 * count])
+    offset += 8 * count
+    extra = None
+    if len(raw) >= offset + 32 * count:
+        extra = [_from_bytes("d", raw[offset + 8 * count * j:offset + 8 * count * (j + 1)]) for j in range(4)]
+    results = []
+    ordinal = first
+    for i in range(count):
+        if i > 0:
+            ordinal += deltas[i - 1]
+        daily_data = DailyData(datetime.fromordinal(ordinal), closes[i], volumes[i])
+        if extra is not None:
+            daily_data.open = _optional(extra[0][i])
+            daily_data.high = _optional(extra[1][i])
+            daily_data.low = _optional(extra[2][i])
+            daily_data.adj_close = _optional(extra[3][i])
+        results.append(daily_data)
+    return results
@@ -1,6 +1,18 @@
 # Summary: This module contains the class definitions that will be used in the stock analysis program
 
-from datetime import datetime
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date as date_type
+
+_data_listeners = []
+
+# Register a function(stock, daily_data) to call when new daily data is added (used by price alerts)
+def add_data_listener(listener):
+    _data_listeners.append(listener)
+
+def remove_data_listener(listener):
+    if listener in _data_listeners:
+        _data_listeners.remove(listener)
 
 
 class Stock:
@@ -8,7 +20,10 @@ class Stock:
         self._symbol = symbol
         self._name = name
         self._shares = shares
-        self.DataList = [] # list of daily stock data
+        self.DataList = [] # list of daily stock data; append or replace it, but do not reorder it in place
+        self._lock = threading.RLock() # guards shares and DataList across threads
+        self._sorted_list = None # the DataList object _sorted_len refers to
+        self._sorted_len = 0 # leading part of DataList known to be in date order
 
     @property
     def symbol(self):
@@ -31,22 +46,100 @@ class Stock:
     def shares(self,shares):
         raise RuntimeWarning("Use buy() or sell() to change shares.")
 
+    @property
+    def lock(self):
+        return self._lock
+
     def buy(self, shares):
-        self._shares = self._shares + shares
+        with self._lock:
+            self._shares = self._shares + shares
 
     def sell(self, shares):
-       self._shares = self._shares - shares
+        with self._lock:
+            self._shares = self._shares - shares
        
-    # Add daily stock data
-    def add_data(self, stock_data):
-        self.DataList.append(stock_data)
-    
+    # Add daily stock data; notify=False skips the data listeners (for data loaded from the database)
+    def add_data(self, stock_data, notify=True):
+        with self._lock:
+            self.DataList.append(stock_data)
+        if notify:
+            for listener in list(_data_listeners):
+                listener(self, stock_data)
+
+    # Copy of the daily data that is safe to iterate while other threads add data
+    def data_snapshot(self):
+        with self._lock:
+            return list(self.DataList)
+
+    # Make sure DataList is sorted oldest to newest, only checking data added since the last call.
+    # Entries already checked are assumed not to have moved, which is why DataList must not be reordered.
+    def _ensure_sorted(self):
+        data = self.DataList
+        n = len(data)
+        if data is not self._sorted_list or self._sorted_len > n:
+            self._sorted_list = data
+            self._sorted_len = 0
+        i = max(self._sorted_len, 1)
+        while i < n and data[i - 1].date <= data[i].date:
+            i += 1
+        if i < n:
+            data.sort(key=lambda x: x.date)
+        self._sorted_len = n
+
+    # Daily data from start to end (inclusive), oldest to newest. The range is found by binary search
+    # and copied under the lock, so callers can iterate it while other threads add data.
+    def history(self, start=None, end=None):
+        with self._lock:
+            self._ensure_sorted()
+            lo = 0 if start is None else bisect_left(self.DataList, as_datetime(start), key=lambda x: x.date)
+            hi = len(self.DataList) if end is None else bisect_right(self.DataList, as_datetime(end), key=lambda x: x.date)
+            return self.DataList[lo:max(lo, hi)]
+
+    # The most recent sessions of daily data, oldest to newest (a copy, like history)
+    def last(self, sessions):
+        with self._lock:
+            self._ensure_sorted()
+            return self.DataList[max(0, len(self.DataList) - sessions):]
+
+    # Daily data for one date, or None if there is none
+    def at(self, date):
+        date = as_datetime(date)
+        with self._lock:
+            self._ensure_sorted()
+            i = bisect_left(self.DataList, date, key=lambda x: x.date)
+            if i < len(self.DataList) and self.DataList[i].date == date:
+                return self.DataList[i]
+        return None
+
+    # The newest daily data before date, or None if there is none
+    def before(self, date):
+        date = as_datetime(date)
+        with self._lock:
+            self._ensure_sorted()
+            i = bisect_left(self.DataList, date, key=lambda x: x.date)
+            if i > 0:
+                return self.DataList[i - 1]
+        return None
+
+
+# A datetime from a datetime, a date or an mm/dd/yy string (the forms history() and at() accept)
+def as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date_type):
+        return datetime(value.year, value.month, value.day)
+    return datetime.strptime(value, "%m/%d/%y")
+
 
 class DailyData:
-    def __init__(self, date, close, volume):
+    def __init__(self, date, close, volume, open=None, high=None, low=None, adj_close=None):
         self._date = date
         self._close = close
         self._volume = volume
+        self._open = open # open, high, low and adjusted close are optional (None if unknown)
+        self._high = high
+        self._low = low
+        self._adj_close = adj_close
 
     @property
     def date(self):
@@ -69,6 +162,34 @@ class DailyData:
     def volume(self, volume):
         self._volume = volume
 
+    @property
+    def open(self):
+        return self._open
+    @open.setter
+    def open(self, open):
+        self._open = open
+
+    @property
+    def high(self):
+        return self._high
+    @high.setter
+    def high(self, high):
+        self._high = high
+
+    @property
+    def low(self):
+        return self._low
+    @low.setter
+    def low(self, low):
+        self._low = low
+
+    @property
+    def adj_close(self):
+        return self._adj_close
+    @adj_close.setter
+    def adj_close(self, adj_close):
+        self._adj_close = adj_close
+
 
 # Unit Test - Do Not Change Code Below This Line *** *** *** *** *** *** *** *** ***
 # main() is used for unit testing only. It will run when stock_class.py is run.
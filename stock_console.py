@@ -5,25 +5,75 @@ from stock_class import Stock, DailyData
 from utilities import clear_screen, display_stock_chart
 from os import path
 import stock_data
+import stock_metrics
+import stock_report
+from stock_worker import BackgroundWorker
+from stock_journal import TradeJournal
+import stock_alerts
+from stock_alerts import AlertEngine
 import yfinance as yf
 import sqlite3
 import holidays
 import pytz
 
+worker = None
+journal = None
+alerts = None
+
+# Background worker shared by the console, created on first use
+def get_worker():
+    global worker
+    if worker is None:
+        worker = BackgroundWorker(workers=2)
+    return worker
+
+# Trade journal shared by the console, opened on first use
+def get_journal():
+    global journal
+    if journal is None:
+        journal = TradeJournal()
+    return journal
+
+# Price alert rules shared by the console, loaded on first use
+def get_alerts():
+    global alerts
+    if alerts is None:
+        alerts = AlertEngine()
+    return alerts
+
+# Record a buy or sell in the journal and compact it in the background when it grows
+def journal_trade(stock_list, stock, side, shares):
+    get_journal().trade(stock, side, shares)
+    if get_journal().needs_compact():
+        get_worker().submit("Compact trade journal", [lambda output: get_journal().compact(list(stock_list))])
+
+# Show progress of any background jobs still running
+def show_job_status():
+    active = get_worker().active_jobs()
+    if len(active) > 0:
+        print(f"Background Jobs Running: {len(active)}")
+        for job in active:
+            print(f"\t{job.summary()}")
+    if get_alerts().unseen > 0:
+        print(f"New Price Alerts: {get_alerts().unseen} (see Price Alerts)")
+
 # Main Menu
 def main_menu(stock_list):
     option = ""
     while option != "0":
         clear_screen()
+        show_job_status()
         print("Stock Analyzer ---")
         print("1 - Manage Stocks (Add, Update, Delete, List)")
         print("2 - Add Daily Stock Data (Date, Price, Volume)")
         print("3 - Show Report")
         print("4 - Show Chart")
         print("5 - Manage Data (Save, Load, Retrieve)")
+        print("6 - View Background Jobs")
+        print("7 - Price Alerts")
         print("0 - Exit Program")
         option = input("Enter Menu Option: ")
-        while option not in ["1","2","3","4","5","0"]:
+        while option not in ["1","2","3","4","5","6","7","0"]:
             clear_screen()
             print("*** Invalid Option - Try again ***")
             print("Stock Analyzer ---")
@@ -32,6 +82,8 @@ def main_menu(stock_list):
             print("3 - Show Report")
             print("4 - Show Chart")
             print("5 - Manage Data (Save, Load, Retrieve)")
+            print("6 - View Background Jobs")
+            print("7 - Price Alerts")
             print("0 - Exit Program")
             option = input("Enter Menu Option: ")
         if option == "1":
@@ -44,8 +96,17 @@ def main_menu(stock_list):
             display_chart(stock_list)
         elif option == "5":
             manage_data(stock_list)
+        elif option == "6":
+            list_jobs()
+        elif option == "7":
+            manage_alerts(stock_list)
         else:
             clear_screen()
+            if len(get_worker().active_jobs()) > 0:
+                print("Waiting for background jobs to finish...")
+                get_worker().wait_all()
+            get_journal().compact(stock_list)
+            get_journal().close()
             print("Goodbye")
 
 # Manage Stocks
@@ -114,8 +175,10 @@ def add_stock(stock_list):
             _ = input("Press Enter to continue...")
             return
         
-        new_stock = Stock(symbol, name, shares)
+        new_stock = Stock(symbol, name, 0)
         stock_list.append(new_stock)
+        if shares != 0:
+            journal_trade(stock_list, new_stock, "buy", shares)
 
         print(f"Stock {symbol} ({name}) with {shares} added to list.")
         option = input("Press Enter to add another stock or 0 to exit: ")
@@ -171,7 +234,7 @@ def buy_stock(stock_list):
                     return
                 
                     
-                stock.buy(shares)
+                journal_trade(stock_list, stock, "buy", shares)
                
                 print(f"Bought {shares} shares of {symbol}.")
                 print(f"Total shares of {symbol}: {stock.shares}")
@@ -210,7 +273,7 @@ def sell_stock(stock_list):
                     _ = input("Press Enter to continue...")
                     return
                     
-                stock.sell(shares)
+                journal_trade(stock_list, stock, "sell", shares)
                 
                 print(f"Sold {shares} shares of {symbol}.")
                 print(f"Total shares of {symbol}: {stock.shares}")
@@ -338,33 +401,34 @@ def display_report(stock_data):
     print("SYMBOL\tNAME\t\tSHARES\tCURRENT\tMKT VALUE")
     print("=" * 60)
 
-    for stock in stock_data:
-        # Calculate current price and market value
-        current_price = 0
-        if len(stock.DataList) > 0:
-            stock.DataList.sort(key=lambda x: x.date, reverse=True)
-            current_price = stock.DataList[0].close
+    with stock_metrics.span("display_report"):
+        for stock in stock_data:
+            # Calculate current price and market value
+            history = stock.history() # oldest to newest
+            current_price = 0
+            if len(history) > 0:
+                current_price = history[-1].close
         
-        market_value = current_price * stock.shares
-        print(f"{stock.symbol}\t{stock.name}\t{stock.shares}\t{current_price:.2f}\t{market_value:.2f}")
-
-        # If there's price history, show change
-        if len(stock.DataList) > 1:
-            prev_price = stock.DataList[1].close
-            change = current_price - prev_price
-            percent = (change / prev_price) * 100
-            print(f"\tPrevious Close: ${prev_price:.2f}")
-            print(f"\tChange: ${change:.2f} ({percent:.2f}%)")
-
-        print("\n\tDate\t\tClose\t\tVolume")
-        print("\t" + "-" * 40)
-
-        # Show full price/volume history (most recent first)
-        for data in stock.DataList:
-            date_str = data.date.strftime("%Y-%m-%d")
-            print(f"\t{date_str}\t${data.close:.2f}\t\t{int(data.volume)}")
+            market_value = current_price * stock.shares
+            print(f"{stock.symbol}\t{stock.name}\t{stock.shares}\t{current_price:.2f}\t{market_value:.2f}")
+
+            # If there's price history, show change
+            if len(history) > 1:
+                prev_price = history[-2].close
+                change = current_price - prev_price
+                percent = (change / prev_price) * 100
+                print(f"\tPrevious Close: ${prev_price:.2f}")
+                print(f"\tChange: ${change:.2f} ({percent:.2f}%)")
+
+            print("\n\tDate\t\tClose\t\tVolume")
+            print("\t" + "-" * 40)
+
+            # Show full price/volume history (most recent first)
+            for data in reversed(history):
+                date_str = data.date.strftime("%Y-%m-%d")
+                print(f"\t{date_str}\t${data.close:.2f}\t\t{int(data.volume)}")
         
-        print("-" * 60)
+            print("-" * 60)
 
     _ = input("Press Enter to continue...")
 
@@ -394,33 +458,48 @@ def manage_data(stock_list):
         print("2 - Load Data from Database")
         print("3 - Retrieve Data from Web")
         print("4 - Import Data from CSV")
+        print("5 - Export Report to File (CSV, JSON)")
         print("0 - Exit Manage Data")
         option = input("Enter Menu Option: ")
 
-        while option not in ["1","2","3","4","0"]:
+        while option not in ["1","2","3","4","5","0"]:
             clear_screen()
             print("*** Invalid Option - Try again ***")
             print("1 - Save Data to Database")
             print("2 - Load Data from Database")
             print("3 - Retrieve Data from Web")
             print("4 - Import Data from CSV")
+            print("5 - Export Report to File (CSV, JSON)")
             print("0 - Exit Manage Data")
             option = input("Enter Menu Option: ")
         
         if option == "1":
             overwrite = input(f"Do you want to overwrite the Database using local data? (y/n): ").lower()
             overwrite = True if overwrite == "y" else False
-            stock_data.save_stock_data(stock_list, overwrite=overwrite)
-            print("Data saved to database.")
+            if overwrite and len(get_worker().active_jobs()) > 0:
+                # overwriting deletes stocks.db, which queued jobs may still be writing to
+                print("Background jobs are still running. Please wait for them to finish before overwriting.")
+                _ = input("Press Enter to continue...")
+                continue
+            # the journal records which trades the saved shares include
+            job = get_worker().submit("Save to database", [lambda output: get_journal().save(list(stock_list), overwrite=overwrite)])
+            print(f"Save queued as background job #{job.job_id}.")
             _ = input("Press Enter to continue...")
         elif option == "2":
+            if len(get_worker().active_jobs()) > 0:
+                print("Background jobs are still running. Please wait for them to finish before loading.")
+                _ = input("Press Enter to continue...")
+                continue
             stock_data.load_stock_data(stock_list)
+            get_journal().replay(stock_list)
             print("Data loaded from database.")
             _ = input("Press Enter to continue...")
         elif option == "3":
             retrieve_from_web(stock_list)
         elif option == "4":
             import_csv(stock_list)
+        elif option == "5":
+            export_report_file(stock_list)
 
 # Get stock price and volume history from Yahoo! Finance using Web Scraping
 def retrieve_from_web(stock_list):
@@ -470,16 +549,12 @@ def retrieve_from_web(stock_list):
                 selected_stocks.append(stock)
                 break
     
-    print("\nRetrieving data from Yahoo Finance...")
-    print("This may take a few moments...")
-    
-    try:
-        # Use the function from stock_data module
-        record_count = stock_data.retrieve_stock_web(start_date, end_date, selected_stocks)
-        print(f"\nSuccessfully retrieved {record_count} records.")
-    except Exception as e:
-        print(f"\nError retrieving data: {str(e)}")
-        print("Make sure Chrome and Chrome WebDriver are properly installed.")
+    # Retrieve one stock per step so the menu can show progress
+    steps = [lambda output, stock=stock: stock_data.retrieve_stock_web(start_date, end_date, [stock]) for stock in selected_stocks]
+    job = get_worker().submit(f"Retrieve {symbol} {start_date}-{end_date}", steps)
+    print(f"\nRetrieval from Yahoo Finance queued as background job #{job.job_id}.")
+    print("Progress is shown on the main menu and under View Background Jobs.")
+    print("Make sure Chrome and Chrome WebDriver are properly installed.")
     
     _ = input("\nPress Enter to continue...")
 
@@ -523,14 +598,157 @@ def import_csv(stock_list):
         _ = input("Press Enter to continue...")
         return
     
-    try:
-        stock_data.import_stock_web_csv(stock_list, symbol, filename)
-        print(f"\nSuccessfully imported data for {symbol}.")
-    except Exception as e:
-        print(f"\nError importing CSV: {str(e)}")
+    job = get_worker().submit(f"Import {symbol} from {path.basename(filename)}", [lambda output: stock_data.import_stock_web_csv(list(stock_list), symbol, filename, output)])
+    print(f"\nImport for {symbol} queued as background job #{job.job_id}.")
     
     _ = input("\nPress Enter to continue...")
 
+# Export the price history report to a CSV or JSON Lines file
+def export_report_file(stock_list):
+    clear_screen()
+    print("Export Report ---")
+    print("1 - CSV")
+    print("2 - JSON Lines")
+    option = input("Enter Format: ")
+    if option not in ["1","2"]:
+        print("Invalid format.")
+        _ = input("Press Enter to continue...")
+        return
+    report_format = "csv" if option == "1" else "jsonl"
+    filename = input("Enter the file name to write: ")
+    symbol = input("Enter stock symbol (or press Enter for all): ").upper()
+    symbols = {symbol} if symbol else None
+    start_date = input("Enter start date (mm/dd/yy, or press Enter for all): ")
+    end_date = input("Enter end date (mm/dd/yy, or press Enter for all): ")
+    try:
+        start = datetime.strptime(start_date, "%m/%d/%y") if start_date else None
+        end = datetime.strptime(end_date, "%m/%d/%y") if end_date else None
+    except ValueError:
+        print("Invalid date format. Please use mm/dd/yy format.")
+        _ = input("Press Enter to continue...")
+        return
+
+    def export(output):
+        with open(filename, "w", newline='') as stream:
+            return stock_report.export_report(stock_report.iter_memory_rows(list(stock_list), symbols, start, end), stream, report_format)
+    job = get_worker().submit(f"Export report to {filename}", [export])
+    print(f"Export queued as background job #{job.job_id}.")
+    _ = input("Press Enter to continue...")
+
+# List background jobs and their results
+def list_jobs():
+    clear_screen()
+    print("Background Jobs ---")
+    jobs = get_worker().jobs()
+    if len(jobs) == 0:
+        print("No background jobs.")
+    for job in jobs:
+        print(job.summary())
+        if job.status == "Done" and job.description.startswith("Retrieve"):
+            print(f"\tRetrieved {sum(job.results)} records.")
+        if job.finished:
+            # messages the job printed, each shown once with a count
+            counts = {}
+            for line in job.output.splitlines():
+                counts[line] = counts.get(line, 0) + 1
+            for line, count in counts.items():
+                print(f"\t{line}" + (f" (x{count})" if count > 1 else ""))
+    get_worker().clear_finished()
+    _ = input("Press Enter to continue...")
+
+# Manage price alert rules and view triggered alerts
+def manage_alerts(stock_list):
+    option = ""
+    while option != "0":
+        clear_screen()
+        print("Price Alerts ---")
+        print("1 - Add Alert Rule")
+        print("2 - Delete Alert Rule")
+        print("3 - List Alert Rules")
+        print("4 - View Triggered Alerts")
+        print("0 - Exit Price Alerts")
+        option = input("Enter Menu Option: ")
+        while option not in ["1","2","3","4","0"]:
+            clear_screen()
+            print("*** Invalid Option - Try again ***")
+            print("1 - Add Alert Rule")
+            print("2 - Delete Alert Rule")
+            print("3 - List Alert Rules")
+            print("4 - View Triggered Alerts")
+            print("0 - Exit Price Alerts")
+            option = input("Enter Menu Option: ")
+        if option == "1":
+            add_alert_rule(stock_list)
+        elif option == "2":
+            delete_alert_rule()
+        elif option == "3":
+            list_alert_rules()
+        elif option == "4":
+            view_alerts()
+        else:
+            print("Returning to Main Menu")
+
+def add_alert_rule(stock_list):
+    clear_screen()
+    print("Add Alert Rule ---")
+    print("Stock List: [" + ", ".join(stock.symbol for stock in stock_list) + "]")
+    symbol = input("Enter Stock Symbol (or * for all stocks): ").upper()
+    if symbol != stock_alerts.ALL_SYMBOLS and not any(stock.symbol == symbol for stock in stock_list):
+        print(f"Error: Stock symbol {symbol} not found in list.")
+        _ = input("Press Enter to continue...")
+        return
+    print("1 - Closes Above Price")
+    print("2 - Closes Below Price")
+    print("3 - Moves More Than Percent (Day over Day)")
+    kind = {"1": "above", "2": "below", "3": "move"}.get(input("Enter Alert Type: "))
+    if kind is None:
+        print("Invalid alert type.")
+        _ = input("Press Enter to continue...")
+        return
+    try:
+        threshold = float(input("Enter Percent: " if kind == "move" else "Enter Price: "))
+        rule = get_alerts().add_rule(symbol, kind, threshold)
+        print(f"Alert #{rule.rule_id} added: {rule.describe()}.")
+    except ValueError as e:
+        print(f"Error: {e}")
+    _ = input("Press Enter to continue...")
+
+def delete_alert_rule():
+    clear_screen()
+    print("Delete Alert Rule ---")
+    for rule in get_alerts().rules():
+        print(f"#{rule.rule_id}\t{rule.describe()}")
+    try:
+        rule_id = int(input("Enter Alert Rule Number to delete: "))
+    except ValueError:
+        rule_id = None
+    if rule_id is not None and get_alerts().remove_rule(rule_id):
+        print(f"Alert rule #{rule_id} deleted.")
+    else:
+        print("Error: Alert rule not found.")
+    _ = input("Press Enter to continue...")
+
+def list_alert_rules():
+    clear_screen()
+    print("Alert Rules ---")
+    rules = get_alerts().rules()
+    if len(rules) == 0:
+        print("No alert rules.")
+    for rule in rules:
+        print(f"#{rule.rule_id}\t{rule.describe()}")
+    _ = input("Press Enter to continue...")
+
+def view_alerts():
+    clear_screen()
+    print("Triggered Alerts ---")
+    recent = stock_alerts.query_alerts(filename=get_alerts().filename)
+    if len(recent) == 0:
+        print("No alerts triggered.")
+    for alert in recent:
+        print(f"{alert['date']}\t{alert['message']}")
+    get_alerts().mark_seen()
+    _ = input("Press Enter to continue...")
+
 # Begin program
 def main():
     #check for database, create if not exists
@@ -538,8 +756,13 @@ def main():
         stock_data.create_database()
     stock_list = []
 
-    # Load existing data
+    # Load existing data, then apply any trades made since the last save
     stock_data.load_stock_data(stock_list)
+    if get_journal().replay(stock_list) > 0:
+        get_journal().compact(stock_list)
+
+    # check alert rules against every new session added from here on
+    get_alerts().attach()
     
     main_menu(stock_list)
 
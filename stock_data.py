@@ -13,9 +13,227 @@ import time
 from datetime import datetime
 from utilities import clear_screen
 from utilities import sortDailyData
-from stock_class import Stock, DailyData
+from stock_class import Stock, DailyData, as_datetime
+from datetime import timedelta
+import stock_metrics
+from stock_metrics import timed
+from stock_blocks import encode_block, decode_block
+
+# How save_stock_data stores daily data: "rows" (one row per day in dailyData) or
+# "blocks" (one compressed BLOB per symbol per year in dailyBlocks)
+STORAGE_MODE = os.environ.get("STOCK_STORAGE", "rows")
+
+# Dates are stored as mm/dd/yy text, which does not sort by date. This expression turns the
+# stored text into yyyymmdd so range queries can use an index (years 69-99 are 19xx, like %y).
+DATE_KEY_SQL = "((CASE WHEN substr(date,7,2) < '69' THEN '20' ELSE '19' END) || substr(date,7,2) || substr(date,1,2) || substr(date,4,2))"
+
+def date_key(date):
+    return date.strftime("%Y%m%d")
+
+_save_listeners = []
+
+# Register a function to call after data is saved (used to invalidate caches)
+def add_save_listener(listener):
+    _save_listeners.append(listener)
+
+def notify_saved():
+    for listener in list(_save_listeners):
+        listener()
+
+# Open stocks.db read-only so readers can never take a write lock
+def connect_read_only():
+    stockDB = "stocks.db"
+    return sqlite3.connect(f"file:{os.path.abspath(stockDB)}?mode=ro", uri=True, check_same_thread=False)
+
+# Switch stocks.db to write-ahead logging so readers and a writer do not block each other
+def enable_wal():
+    stockDB = "stocks.db"
+    conn = sqlite3.connect(stockDB)
+    mode = conn.execute("PRAGMA journal_mode=WAL;").fetchone()[0]
+    conn.close()
+    return mode
+
+# Index on (symbol, sortable date) used by range queries
+def create_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS dailyDataSymbolDate ON dailyData (symbol, " + DATE_KEY_SQL + ");")
+
+# Table of compressed yearly blocks; minDate/maxDate are yyyymmdd so blocks can be picked by range
+def create_block_table(cur):
+    createDailyBlocksTableCmd = """CREATE TABLE IF NOT EXISTS dailyBlocks (
+                            symbol TEXT NOT NULL,
+                            year INTEGER NOT NULL,
+                            minDate TEXT NOT NULL,
+                            maxDate TEXT NOT NULL,
+                            rowCount INTEGER NOT NULL,
+                            data BLOB NOT NULL,
+                            PRIMARY KEY (symbol, year)
+                        );"""
+    cur.execute(createDailyBlocksTableCmd)
+    cur.execute("CREATE INDEX IF NOT EXISTS dailyBlocksSymbolRange ON dailyBlocks (symbol, maxDate, minDate);")
+
+# Columns added to dailyData for full OHLCV data (NULL for rows saved before they existed)
+OHLC_COLUMNS = ["open", "high", "low", "adjClose"]
+DAILY_COLUMNS_SQL = "date, price, volume, open, high, low, adjClose"
+
+# Add any missing OHLC columns to an older dailyData table
+def upgrade_daily_data(cur):
+    existing = {row[1] for row in cur.execute("PRAGMA table_info(dailyData);").fetchall()}
+    for column in OHLC_COLUMNS:
+        if column not in existing:
+            cur.execute(f"ALTER TABLE dailyData ADD COLUMN {column} REAL;")
+
+def has_ohlc_columns(conn):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(dailyData);").fetchall()}
+    return all(column in existing for column in OHLC_COLUMNS)
+
+def daily_columns_sql(conn):
+    return DAILY_COLUMNS_SQL if has_ohlc_columns(conn) else "date, price, volume"
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+# Turn a (date, price, volume[, open, high, low, adjClose]) row into DailyData
+def daily_data_from_row(row):
+    daily_data = DailyData(datetime.strptime(row[0],"%m/%d/%y"),float(row[1]),float(row[2]))
+    if len(row) > 3:
+        daily_data.open = _optional_float(row[3])
+        daily_data.high = _optional_float(row[4])
+        daily_data.low = _optional_float(row[5])
+        daily_data.adj_close = _optional_float(row[6])
+    return daily_data
+
+def daily_data_values(symbol, daily_data):
+    return (symbol,daily_data.date.strftime("%m/%d/%y"),daily_data.close,daily_data.volume,
+            daily_data.open,daily_data.high,daily_data.low,daily_data.adj_close)
+
+# Weekly and monthly bars; period is the first calendar day of the bucket (yyyymmdd)
+ROLLUP_TABLES = {"weekly": "weeklyData", "monthly": "monthlyData"}
+
+def create_rollup_tables(cur):
+    created = False
+    for table in ROLLUP_TABLES.values():
+        if cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (table,)).fetchone() is None:
+            created = True
+        cur.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                            symbol TEXT NOT NULL,
+                            period TEXT NOT NULL,
+                            startDate TEXT NOT NULL,
+                            endDate TEXT NOT NULL,
+                            open REAL,
+                            high REAL,
+                            low REAL,
+                            close REAL NOT NULL,
+                            adjClose REAL,
+                            volume REAL NOT NULL,
+                            days INTEGER NOT NULL,
+                            PRIMARY KEY (symbol, period)
+                        );""")
+    return created
+
+# Start and end of the weekly or monthly bucket holding date
+def rollup_bucket(period, date):
+    if period == "weekly":
+        start = datetime(date.year, date.month, date.day) - timedelta(days=date.weekday())
+        return start, start + timedelta(days=6)
+    start = datetime(date.year, date.month, 1)
+    next_month = datetime(date.year + (date.month == 12), date.month % 12 + 1, 1)
+    return start, next_month - timedelta(days=1)
+
+# Combine daily data (oldest to newest) into one OHLCV bar
+def make_bar(daily_list):
+    first = daily_list[0]
+    last = daily_list[-1]
+    return {"open": first.open if first.open is not None else first.close,
+            "high": max(d.high if d.high is not None else d.close for d in daily_list),
+            "low": min(d.low if d.low is not None else d.close for d in daily_list),
+            "close": last.close,
+            "adjClose": last.adj_close,
+            "volume": sum(d.volume for d in daily_list),
+            "startDate": date_key(first.date),
+            "endDate": date_key(last.date),
+            "days": len(daily_list)}
+
+# Daily data for one stock from rows and blocks on an open connection, oldest to newest
+def read_daily_data(conn, symbol, start, end):
+    rowsCmd = "SELECT " + daily_columns_sql(conn) + " FROM dailyData WHERE symbol=? AND " + DATE_KEY_SQL + " BETWEEN ? AND ?;"
+    merged = {}
+    if has_block_table(conn):
+        for daily_data in load_blocks(conn, symbol, start, end):
+            merged[daily_data.date] = daily_data
+    for dailyRow in conn.execute(rowsCmd, (symbol, date_key(start), date_key(end))).fetchall():
+        daily_data = daily_data_from_row(dailyRow)
+        merged.setdefault(daily_data.date, daily_data)
+    return sorted(merged.values(), key=lambda x: x.date)
+
+# Recompute only the weekly and monthly bars that contain the given dates
+def update_rollups(conn, symbol, dates):
+    buckets = set()
+    for date in dates:
+        for period in ROLLUP_TABLES:
+            buckets.add((period, rollup_bucket(period, date)))
+    for period, (start, end) in buckets:
+        table = ROLLUP_TABLES[period]
+        daily_list = read_daily_data(conn, symbol, start, end)
+        if len(daily_list) == 0:
+            conn.execute(f"DELETE FROM {table} WHERE symbol=? AND period=?;", (symbol, date_key(start)))
+            continue
+        bar = make_bar(daily_list)
+        conn.execute(f"""INSERT OR REPLACE INTO {table}
+                            (symbol, period, startDate, endDate, open, high, low, close, adjClose, volume, days)
+                            VALUES
+                            (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);""",
+                     (symbol, date_key(start), bar["startDate"], bar["endDate"], bar["open"], bar["high"],
+                      bar["low"], bar["close"], bar["adjClose"], bar["volume"], bar["days"]))
+    stock_metrics.incr("rollup_buckets_updated", len(buckets))
+
+# Rebuild every weekly and monthly bar from the daily data
+def rebuild_rollups(conn):
+    for table in ROLLUP_TABLES.values():
+        conn.execute(f"DELETE FROM {table};")
+    for row in conn.execute("SELECT symbol FROM stocks;").fetchall():
+        symbol = row[0]
+        dates = [datetime.strptime(r[0],"%m/%d/%y") for r in conn.execute("SELECT date FROM dailyData WHERE symbol=?;", (symbol,)).fetchall()]
+        if has_block_table(conn):
+            dates += [d.date for d in load_blocks(conn, symbol)]
+        update_rollups(conn, symbol, dates)
+
+# Bring an existing database up to date: indexes, block table, OHLC columns and rollups
+def upgrade_database(conn):
+    cur = conn.cursor()
+    create_indexes(cur)
+    create_block_table(cur)
+    upgrade_daily_data(cur)
+    if create_rollup_tables(cur):
+        rebuild_rollups(conn)
+    conn.commit()
+
+def has_block_table(conn):
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='dailyBlocks';").fetchone()
+    return row is not None
+
+# Decode the blocks for a symbol that overlap start..end (newest block first)
+def load_blocks(conn, symbol, start=None, end=None, sessions=None):
+    blockCmd = "SELECT data FROM dailyBlocks WHERE symbol=?"
+    selectValues = [symbol]
+    if start is not None:
+        blockCmd += " AND maxDate >= ?"
+        selectValues.append(date_key(start))
+    if end is not None:
+        blockCmd += " AND minDate <= ?"
+        selectValues.append(date_key(end))
+    blockCmd += " ORDER BY maxDate DESC"
+    results = []
+    for row in conn.execute(blockCmd, selectValues):
+        stock_metrics.incr("blocks_decoded")
+        for daily_data in decode_block(row[0]):
+            if (start is None or daily_data.date >= start) and (end is None or daily_data.date <= end):
+                results.append(daily_data)
+        if sessions is not None and len(results) >= sessions:
+            break
+    return results
 
 # Create the SQLite database
+@timed
 def create_database():
     stockDB = "stocks.db"
     conn = sqlite3.connect(stockDB)
@@ -30,70 +248,237 @@ def create_database():
                             date TEXT NOT NULL,
                             price REAL NOT NULL,
                             volume REAL NOT NULL,
+                            open REAL,
+                            high REAL,
+                            low REAL,
+                            adjClose REAL,
                             PRIMARY KEY (symbol, date)
                         );"""   
     cur.execute(createStockTableCmd)
     cur.execute(createDailyDataTableCmd)
+    upgrade_database(conn)
 
-# Save stocks and daily data into database
-def save_stock_data(stock_list, overwrite=False):
+# Save stocks and daily data into database and return the number of new daily data rows saved. When
+# journal_seq is given, share_rows (symbol, name, shares) are written for every stock in the same
+# transaction as the journal position they include.
+@timed
+def save_stock_data(stock_list, overwrite=False, storage=None, share_rows=None, journal_seq=None):
+    if storage is None:
+        storage = STORAGE_MODE
     if overwrite:
         # Delete the existing database if overwrite is True
         if os.path.exists("stocks.db"):
+            if journal_seq is None:
+                # keep the journal position so trades already in the saved shares are not replayed again
+                journal_seq = load_journal_seq()
             os.remove("stocks.db")
         create_database()
     stockDB = "stocks.db"
     conn = sqlite3.connect(stockDB)
+    upgrade_database(conn)
     cur = conn.cursor()
     insertStockCmd = """INSERT INTO stocks
                             (symbol, name, shares)
                             VALUES
                             (?, ?, ?); """
+    if journal_seq is not None:
+        if share_rows is None:
+            share_rows = [(stock.symbol, stock.name, stock.shares) for stock in stock_list]
+        with conn:
+            write_shares(conn, share_rows, journal_seq)
     insertDailyDataCmd = """INSERT INTO dailyData
-                                    (symbol, date, price, volume)
+                                    (symbol, date, price, volume, open, high, low, adjClose)
                                     VALUES
-                                    (?, ?, ?, ?);"""
+                                    (?, ?, ?, ?, ?, ?, ?, ?);"""
+    saved = 0
     for stock in stock_list:
-        insertValues = (stock.symbol, stock.name, stock.shares)
-        try:
-            cur.execute(insertStockCmd, insertValues)
-            cur.execute("COMMIT;")
-        except:
-            pass
-        for daily_data in stock.DataList: 
-            insertValues = (stock.symbol,daily_data.date.strftime("%m/%d/%y"),daily_data.close,daily_data.volume)
+        if journal_seq is None:
+            insertValues = (stock.symbol, stock.name, stock.shares)
             try:
-                cur.execute(insertDailyDataCmd, insertValues)
+                cur.execute(insertStockCmd, insertValues)
                 cur.execute("COMMIT;")
             except:
                 pass
-    
+        if storage == "blocks":
+            saved += save_stock_blocks(conn, stock)
+            continue
+        new_dates = []
+        data_list = stock.data_snapshot()
+        # dates already stored in a block are saved; skip them like existing rows
+        block_dates = set()
+        if len(data_list) > 0 and has_block_table(conn):
+            dates = [daily_data.date for daily_data in data_list]
+            block_dates = {daily_data.date for daily_data in load_blocks(conn, stock.symbol, min(dates), max(dates))}
+        for daily_data in data_list:
+            if daily_data.date in block_dates:
+                stock_metrics.incr("save_rows_skipped")
+                continue
+            insertValues = daily_data_values(stock.symbol, daily_data)
+            try:
+                cur.execute(insertDailyDataCmd, insertValues)
+                cur.execute("COMMIT;")
+                new_dates.append(daily_data.date)
+                stock_metrics.incr("save_rows_processed")
+            except:
+                stock_metrics.incr("save_rows_skipped")
+        with conn:
+            update_rollups(conn, stock.symbol, new_dates)
+        saved += len(new_dates)
+    conn.close()
+    notify_saved()
+    return saved
+
+# Merge a stock's daily data into its yearly blocks. Existing data wins for dates already
+# saved (like the row inserts), and rows in dailyData for those years move into the block.
+# Returns the number of new dates saved.
+def save_stock_blocks(conn, stock):
+    cur = conn.cursor()
+    years = {}
+    new_dates = []
+    for daily_data in stock.data_snapshot():
+        years.setdefault(daily_data.date.year, []).append(daily_data)
+    with conn:
+        for year, year_data in years.items():
+            merged = {}
+            blockRow = cur.execute("SELECT data FROM dailyBlocks WHERE symbol=? AND year=?;", (stock.symbol, year)).fetchone()
+            if blockRow is not None:
+                for daily_data in decode_block(blockRow[0]):
+                    merged[daily_data.date] = daily_data
+            yearRange = (stock.symbol, f"{year}0101", f"{year}1231")
+            rowsCmd = "SELECT " + DAILY_COLUMNS_SQL + " FROM dailyData WHERE symbol=? AND " + DATE_KEY_SQL + " BETWEEN ? AND ?;"
+            for dailyRow in cur.execute(rowsCmd, yearRange).fetchall():
+                daily_data = daily_data_from_row(dailyRow)
+                merged.setdefault(daily_data.date, daily_data)
+            for daily_data in year_data:
+                if daily_data.date in merged:
+                    stock_metrics.incr("save_rows_skipped")
+                else:
+                    merged[daily_data.date] = daily_data
+                    new_dates.append(daily_data.date)
+                    stock_metrics.incr("save_rows_processed")
+            block_data = sorted(merged.values(), key=lambda x: x.date)
+            insertBlockCmd = """INSERT OR REPLACE INTO dailyBlocks
+                                    (symbol, year, minDate, maxDate, rowCount, data)
+                                    VALUES
+                                    (?, ?, ?, ?, ?, ?);"""
+            cur.execute(insertBlockCmd, (stock.symbol, year, date_key(block_data[0].date), date_key(block_data[-1].date), len(block_data), encode_block(block_data)))
+            cur.execute("DELETE FROM dailyData WHERE symbol=? AND " + DATE_KEY_SQL + " BETWEEN ? AND ?;", yearRange)
+        update_rollups(conn, stock.symbol, new_dates)
+    return len(new_dates)
+
 # Load stocks and daily data from database
-def load_stock_data(stock_list):
+@timed
+def load_stock_data(stock_list, read_only=False):
     stock_list.clear()
     stockDB = "stocks.db"
-    conn = sqlite3.connect(stockDB)
+    conn = connect_read_only() if read_only else sqlite3.connect(stockDB)
     stockCur = conn.cursor()
     stockSelectCmd = """SELECT symbol, name, shares
                     FROM stocks; """
     stockCur.execute(stockSelectCmd)
     stockRows = stockCur.fetchall()
+    blocks = has_block_table(conn)
+    columns = daily_columns_sql(conn)
     for row in stockRows:
         new_stock = Stock(row[0],row[1],row[2])
         dailyDataCur = conn.cursor()
-        dailyDataCmd = """SELECT date, price, volume
+        dailyDataCmd = "SELECT " + columns + """
                         FROM dailyData
                         WHERE symbol=?; """
         selectValue = (new_stock.symbol)
         dailyDataCur.execute(dailyDataCmd,(selectValue,))
         dailyDataRows = dailyDataCur.fetchall()
+        # block data wins for a date found in both, as in every other reader
+        seen = set()
+        if blocks:
+            for daily_data in load_blocks(conn, new_stock.symbol):
+                seen.add(daily_data.date)
+                new_stock.add_data(daily_data, notify=False)
         for dailyRow in dailyDataRows:
-            daily_data = DailyData(datetime.strptime(dailyRow[0],"%m/%d/%y"),float(dailyRow[1]),float(dailyRow[2]))
-            new_stock.add_data(daily_data)
+            daily_data = daily_data_from_row(dailyRow)
+            if daily_data.date not in seen:
+                new_stock.add_data(daily_data, notify=False)
+        stock_metrics.incr("load_rows_processed", len(dailyDataRows))
         stock_list.append(new_stock)
+    conn.close()
     sortDailyData(stock_list)
 
+# Load the list of stocks without any daily data
+@timed
+def query_stocks(read_only=False):
+    stockDB = "stocks.db"
+    conn = connect_read_only() if read_only else sqlite3.connect(stockDB)
+    stockRows = conn.execute("SELECT symbol, name, shares FROM stocks ORDER BY symbol;").fetchall()
+    conn.close()
+    return [Stock(row[0],row[1],row[2]) for row in stockRows]
+
+# Load daily data for one stock between start and end (inclusive), oldest to newest
+@timed
+def query_stock_data(symbol, start=None, end=None, sessions=None, read_only=False):
+    start = None if start is None else as_datetime(start)
+    end = None if end is None else as_datetime(end)
+    stockDB = "stocks.db"
+    conn = connect_read_only() if read_only else sqlite3.connect(stockDB)
+    cur = conn.cursor()
+    if not read_only:
+        create_indexes(cur)
+    dailyDataCmd = "SELECT " + daily_columns_sql(conn) + " FROM dailyData WHERE symbol=?"
+    selectValues = [symbol]
+    if start is not None:
+        dailyDataCmd += " AND " + DATE_KEY_SQL + " >= ?"
+        selectValues.append(date_key(start))
+    if end is not None:
+        dailyDataCmd += " AND " + DATE_KEY_SQL + " <= ?"
+        selectValues.append(date_key(end))
+    if sessions is not None:
+        # newest sessions first, then reversed below
+        dailyDataCmd += " ORDER BY " + DATE_KEY_SQL + " DESC LIMIT ?"
+        selectValues.append(sessions)
+    else:
+        dailyDataCmd += " ORDER BY " + DATE_KEY_SQL
+    dailyDataRows = cur.execute(dailyDataCmd, selectValues).fetchall()
+    if sessions is not None:
+        dailyDataRows.reverse()
+    stock_metrics.incr("query_rows_processed", len(dailyDataRows))
+    results = [daily_data_from_row(row) for row in dailyDataRows]
+    if has_block_table(conn):
+        block_data = load_blocks(conn, symbol, start, end, sessions)
+        if len(block_data) > 0:
+            merged = {daily_data.date: daily_data for daily_data in block_data}
+            for daily_data in results:
+                merged.setdefault(daily_data.date, daily_data)
+            results = sorted(merged.values(), key=lambda x: x.date)
+            if sessions is not None:
+                results = results[-sessions:]
+    conn.close()
+    return results
+
+# Load weekly or monthly bars for one stock; each bar's date is the first day of its week or month
+@timed
+def query_rollup(symbol, period="weekly", start=None, end=None, read_only=False):
+    if period not in ROLLUP_TABLES:
+        raise ValueError(f"Unknown period {period}. Use weekly or monthly.")
+    start = None if start is None else as_datetime(start)
+    end = None if end is None else as_datetime(end)
+    stockDB = "stocks.db"
+    conn = connect_read_only() if read_only else sqlite3.connect(stockDB)
+    if not read_only:
+        upgrade_database(conn)
+    rollupCmd = f"SELECT period, close, volume, open, high, low, adjClose FROM {ROLLUP_TABLES[period]} WHERE symbol=?"
+    selectValues = [symbol]
+    if start is not None:
+        rollupCmd += " AND period >= ?"
+        selectValues.append(date_key(rollup_bucket(period, start)[0]))
+    if end is not None:
+        rollupCmd += " AND period <= ?"
+        selectValues.append(date_key(end))
+    rollupRows = conn.execute(rollupCmd + " ORDER BY period;", selectValues).fetchall()
+    conn.close()
+    stock_metrics.incr("rollup_rows_processed", len(rollupRows))
+    return [DailyData(datetime.strptime(row[0],"%Y%m%d"),row[1],row[2],row[3],row[4],row[5],row[6]) for row in rollupRows]
+
 # Get stock price history from web using Web Scraping
+@timed
 def retrieve_stock_web(dateStart,dateEnd,stock_list):
     dateFrom = str(int(time.mktime(time.strptime(dateStart,"%m/%d/%y"))))
     dateTo = str(int(time.mktime(time.strptime(dateEnd,"%m/%d/%y"))))
@@ -113,33 +498,116 @@ def retrieve_stock_web(dateStart,dateEnd,stock_list):
         except:
             raise RuntimeWarning("Chrome Driver Not Found")
 
-        soup = BeautifulSoup(driver.page_source,"html.parser")
+        pageSource = driver.page_source
+        stock_metrics.incr("fetch_bytes_read", len(pageSource))
+        soup = BeautifulSoup(pageSource,"html.parser")
         row = soup.find('table',class_="W(100%) M(0)")
         dataRows = soup.find_all('tr')
+        new_data = []
         for row in dataRows:
             td = row.find_all('td')
             rowList = [i.text for i in td]
             columnCount = len(rowList)
             if columnCount == 7: # This row is a standard data row (otherwise it's a special case such as dividend which will be ignored)
-                daily_data = DailyData(datetime.strptime(rowList[0],"%b %d, %Y"),float(rowList[5].replace(',','')),float(rowList[6].replace(',','')))
-                stock.add_data(daily_data)
+                # columns: date, open, high, low, close, adj close, volume
+                daily_data = DailyData(datetime.strptime(rowList[0],"%b %d, %Y"),float(rowList[4].replace(',','')),float(rowList[6].replace(',','')),
+                                       float(rowList[1].replace(',','')),float(rowList[2].replace(',','')),float(rowList[3].replace(',','')),float(rowList[5].replace(',','')))
+                new_data.append(daily_data)
                 recordCount += 1
+            else:
+                stock_metrics.incr("fetch_rows_skipped")
+        # the page lists the newest day first; add oldest first so each day follows the one before it
+        for daily_data in sorted(new_data, key=lambda x: x.date):
+            stock.add_data(daily_data)
+    stock_metrics.incr("fetch_rows_processed", recordCount)
     return recordCount
 
-# Get price and volume history from Yahoo! Finance using CSV import.
-def import_stock_web_csv(stock_list,symbol,filename):
+# Get price and volume history from Yahoo! Finance using CSV import. Skipped-row messages go to output
+# (standard output by default).
+@timed
+def import_stock_web_csv(stock_list,symbol,filename,output=None):
     for stock in stock_list:
         if stock.symbol == symbol:
+            stock_metrics.incr("import_bytes_read", os.path.getsize(filename))
             with open(filename, newline='') as stockdata:
                 datareader = csv.reader(stockdata,delimiter=',')
                 next(datareader)
+                new_data = []
                 for row in datareader:
                     try:
-                        daily_data = DailyData(datetime.strptime(row[0],"%Y-%m-%d"),float(row[4]),float(row[6]))
+                        daily_data = DailyData(datetime.strptime(row[0],"%Y-%m-%d"),float(row[4]),float(row[6]),
+                                               float(row[1]),float(row[2]),float(row[3]),float(row[5]))
                     except:
-                        print('Dividend or other non-standard data found. Skipping row.')
+                        print('Dividend or other non-standard data found. Skipping row.', file=output)
+                        stock_metrics.incr("import_rows_skipped")
                         continue
-                    stock.add_data(daily_data)
+                    new_data.append(daily_data)
+                    stock_metrics.incr("import_rows_processed")
+            # Yahoo! Finance files list the newest day first; add oldest first so each day follows the one before it
+            for daily_data in sorted(new_data, key=lambda x: x.date):
+                stock.add_data(daily_data)
+
+# Insert a batch of (symbol, date, price, volume[, open, high, low, adjClose]) rows in a single transaction
+@timed
+def save_daily_data_batch(rows):
+    stockDB = "stocks.db"
+    conn = sqlite3.connect(stockDB)
+    upgrade_database(conn)
+    rows = [tuple(row) + (None,) * (8 - len(row)) for row in rows]
+    insertDailyDataCmd = """INSERT OR IGNORE INTO dailyData
+                                    (symbol, date, price, volume, open, high, low, adjClose)
+                                    VALUES
+                                    (?, ?, ?, ?, ?, ?, ?, ?);"""
+    dates = {}
+    for row in rows:
+        dates.setdefault(row[0], []).append(datetime.strptime(row[1],"%m/%d/%y"))
+    with conn:
+        cur = conn.executemany(insertDailyDataCmd, rows)
+        rowCount = cur.rowcount
+        for symbol, symbol_dates in dates.items():
+            update_rollups(conn, symbol, symbol_dates)
+    conn.close()
+    notify_saved()
+    stock_metrics.incr("batch_rows_processed", rowCount)
+    stock_metrics.incr("batch_rows_skipped", len(rows) - rowCount)
+    return rowCount
+
+# Table holding the last trade journal sequence number already applied to stocks.shares
+def create_journal_table(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS journalState (
+                            id INTEGER PRIMARY KEY CHECK (id = 1),
+                            lastSeq INTEGER NOT NULL
+                        );""")
+
+# Last journal sequence number compacted into the database (0 if none)
+def load_journal_seq():
+    stockDB = "stocks.db"
+    conn = sqlite3.connect(stockDB)
+    create_journal_table(conn.cursor())
+    row = conn.execute("SELECT lastSeq FROM journalState WHERE id=1;").fetchone()
+    conn.close()
+    return 0 if row is None else row[0]
+
+# Upsert (symbol, name, shares) rows and record the journal position; the caller owns the transaction
+def write_shares(conn, share_rows, last_seq):
+    create_journal_table(conn.cursor())
+    upsertStockCmd = """INSERT INTO stocks
+                            (symbol, name, shares)
+                            VALUES
+                            (?, ?, ?)
+                            ON CONFLICT(symbol) DO UPDATE SET shares=excluded.shares;"""
+    conn.executemany(upsertStockCmd, share_rows)
+    conn.execute("INSERT OR REPLACE INTO journalState (id, lastSeq) VALUES (1, ?);", (last_seq,))
+
+# Write current shares for the given (symbol, name, shares) rows and the journal position in one transaction
+@timed
+def save_shares(share_rows, last_seq):
+    stockDB = "stocks.db"
+    conn = sqlite3.connect(stockDB)
+    with conn:
+        write_shares(conn, share_rows, last_seq)
+    conn.close()
+    notify_saved()
 
 def main():
     clear_screen()
@@ -0,0 +1,172 @@
+# Summary: This module contains an append-only journal of buy and sell trades so share changes survive a crash
+# without saving the whole database after every trade.
+#
+# Each trade is one JSON line (seq, symbol, name, side, quantity, price, timestamp). Lines are fsync'd in
+# batches. At startup the journal is replayed on top of the shares loaded from stocks.db, and compact()
+# writes the current shares to the stocks table and drops the journal lines it covered.
+
+import json
+import os
+import threading
+from datetime import datetime
+import stock_data
+import stock_metrics
+from stock_class import Stock
+
+JOURNAL_FILE = "stocks.journal"
+
+
+class TradeJournal:
+    def __init__(self, filename=JOURNAL_FILE, sync_every=20, sync_interval=1.0, compact_every=1000):
+        self._filename = filename
+        self._sync_every = sync_every
+        self._sync_interval = sync_interval
+        self._compact_every = compact_every
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._since_compact = 0
+        self._last_seq = max(stock_data.load_journal_seq(), max((entry["seq"] for entry in self.entries()), default=0))
+        self._drop_torn_line()
+        self._file = open(self._filename, "a", encoding="utf-8")
+        self._closed = threading.Event()
+        self._syncer = threading.Thread(target=self._sync_loop, name="stock-journal-sync", daemon=True)
+        self._syncer.start()
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @property
+    def last_seq(self):
+        return self._last_seq
+
+    # Read all complete journal lines; a torn last line from a crash is ignored
+    def entries(self):
+        if not os.path.exists(self._filename):
+            return []
+        results = []
+        with open(self._filename, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    stock_metrics.incr("journal_lines_skipped")
+        return results
+
+    # Cut a partial last line left by a crash so new trades start on a line of their own
+    def _drop_torn_line(self):
+        if not os.path.exists(self._filename):
+            return
+        with open(self._filename, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+                stock_metrics.incr("journal_lines_skipped")
+
+    # Append one trade; it is durable after the next sync (every sync_every trades or sync_interval seconds)
+    def record(self, stock, side, quantity, price=None):
+        if side not in ("buy", "sell"):
+            raise ValueError(f"Unknown trade side {side}")
+        with self._lock:
+            self._last_seq += 1
+            entry = {"seq": self._last_seq, "symbol": stock.symbol, "name": stock.name, "side": side,
+                     "quantity": quantity, "price": price, "timestamp": datetime.now().isoformat()}
+            self._file.write(json.dumps(entry) + "\n")
+            self._pending += 1
+            self._since_compact += 1
+            stock_metrics.incr("journal_trades_recorded")
+            if self._pending >= self._sync_every:
+                self.sync()
+        return entry
+
+    # Buy or sell shares of a stock and journal the trade, priced at the latest close. The share change and
+    # the journal line happen under the journal lock so a compact never saves one without the other.
+    def trade(self, stock, side, quantity):
+        if side not in ("buy", "sell"):
+            raise ValueError(f"Unknown trade side {side}")
+        latest = stock.last(1)
+        price = latest[0].close if len(latest) > 0 else None
+        with self._lock:
+            if side == "buy":
+                stock.buy(quantity)
+            else:
+                stock.sell(quantity)
+            return self.record(stock, side, quantity, price)
+
+    # Flush buffered trades to disk
+    def sync(self):
+        with self._lock:
+            if self._pending == 0 or self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            stock_metrics.incr("journal_syncs")
+
+    def _sync_loop(self):
+        while not self._closed.wait(self._sync_interval):
+            self.sync()
+
+    def needs_compact(self):
+        return self._since_compact >= self._compact_every
+
+    # Apply journaled trades newer than the last compaction to the loaded stock list
+    @stock_metrics.timed
+    def replay(self, stock_list):
+        applied_seq = stock_data.load_journal_seq()
+        stocks = {stock.symbol: stock for stock in stock_list}
+        count = 0
+        for entry in self.entries():
+            if entry["seq"] <= applied_seq:
+                continue
+            stock = stocks.get(entry["symbol"])
+            if stock is None:
+                # stock was added after the last save; recreate it from the journal
+                stock = Stock(entry["symbol"], entry["name"], 0)
+                stock_list.append(stock)
+                stocks[stock.symbol] = stock
+            if entry["side"] == "buy":
+                stock.buy(entry["quantity"])
+            else:
+                stock.sell(entry["quantity"])
+            count += 1
+        stock_metrics.incr("journal_trades_replayed", count)
+        return count
+
+    # Save stocks and daily data. The shares are written in the same transaction as the journal position
+    # they include, so a crash before the compact that follows cannot make replay apply a trade twice.
+    @stock_metrics.timed
+    def save(self, stock_list, overwrite=False, storage=None):
+        with self._lock:
+            self.sync()
+            save_seq = self._last_seq
+            share_rows = [(stock.symbol, stock.name, stock.shares) for stock in list(stock_list)]
+        stock_data.save_stock_data(stock_list, overwrite=overwrite, storage=storage, share_rows=share_rows, journal_seq=save_seq)
+        self.compact(stock_list)
+
+    # Write current shares to the database and keep only journal lines newer than what was written
+    @stock_metrics.timed
+    def compact(self, stock_list):
+        with self._lock:
+            self.sync()
+            compact_seq = self._last_seq
+            share_rows = [(stock.symbol, stock.name, stock.shares) for stock in list(stock_list)]
+            stock_data.save_shares(share_rows, compact_seq)
+            remaining = [entry for entry in self.entries() if entry["seq"] > compact_seq]
+            temp = self._filename + ".tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                for entry in remaining:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(temp, self._filename)
+            self._file = open(self._filename, "a", encoding="utf-8")
+            self._since_compact = 0
+            stock_metrics.incr("journal_compactions")
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self.sync()
+            self._file.close()
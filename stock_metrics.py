@@ -0,0 +1,178 @@
+# Summary: This module contains timing spans, counters and optional cProfile capture for the data operations.
+# Metrics are off by default; set STOCK_METRICS=1 (and optionally STOCK_METRICS_FILE, STOCK_PROFILE=1)
+# or call enable() to turn them on.
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+_enabled = False
+_profile = None
+_profile_lock = threading.Lock()
+_lock = threading.Lock()
+_local = threading.local()
+_spans = {}     # name -> [calls, total seconds, max seconds]
+_counters = {}  # name -> value
+
+
+def enable(profile=False):
+    global _enabled, _profile
+    _enabled = True
+    if profile and _profile is None:
+        _profile = cProfile.Profile()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    global _profile
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+    if _profile is not None:
+        _profile = cProfile.Profile()
+
+
+# Add value to a named counter (rows processed, rows skipped, retries, cache hits, bytes read, ...)
+def incr(name, value=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def _record(name, seconds):
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            _spans[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+
+
+# Time a block of code; the outermost span on a thread is also profiled in profile mode
+@contextmanager
+def span(name):
+    if not _enabled:
+        yield
+        return
+    depth = getattr(_local, "depth", 0)
+    profiling = False
+    if depth == 0 and _profile is not None and _profile_lock.acquire(blocking=False):
+        profiling = True
+        _profile.enable()
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+        _local.depth = depth
+        if profiling:
+            _profile.disable()
+            _profile_lock.release()
+
+
+# Decorator that wraps a function in a span named after the function
+def timed(func=None, name=None):
+    if func is None:
+        return lambda f: timed(f, name)
+    span_name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with span(span_name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# Copy of the current spans and counters
+def snapshot():
+    with _lock:
+        spans = {name: {"calls": s[0], "seconds": s[1], "max_seconds": s[2]} for name, s in _spans.items()}
+        counters = dict(_counters)
+    return {"spans": spans, "counters": counters}
+
+
+# Append the current metrics to a file as one JSON line per span/counter
+def write_json_lines(filename):
+    data = snapshot()
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    with open(filename, "a") as f:
+        for name, stats in sorted(data["spans"].items()):
+            f.write(json.dumps({"time": timestamp, "type": "span", "name": name, **stats}) + "\n")
+        for name, value in sorted(data["counters"].items()):
+            f.write(json.dumps({"time": timestamp, "type": "counter", "name": name, "value": value}) + "\n")
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+# Write the current metrics in Prometheus text exposition format
+def write_prometheus(filename):
+    data = snapshot()
+    lines = ["# HELP stock_span_calls_total Number of times each operation ran.",
+             "# TYPE stock_span_calls_total counter"]
+    for name, stats in sorted(data["spans"].items()):
+        lines.append(f'stock_span_calls_total{{span="{name}"}} {stats["calls"]}')
+    lines += ["# HELP stock_span_seconds_total Total time spent in each operation.",
+              "# TYPE stock_span_seconds_total counter"]
+    for name, stats in sorted(data["spans"].items()):
+        lines.append(f'stock_span_seconds_total{{span="{name}"}} {stats["seconds"]:.6f}')
+    lines += ["# HELP stock_span_max_seconds Longest single run of each operation.",
+              "# TYPE stock_span_max_seconds gauge"]
+    for name, stats in sorted(data["spans"].items()):
+        lines.append(f'stock_span_max_seconds{{span="{name}"}} {stats["max_seconds"]:.6f}')
+    for name, value in sorted(data["counters"].items()):
+        metric = f"stock_{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    with open(filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+# Save collected cProfile statistics (readable with pstats)
+def write_profile(filename):
+    if _profile is None:
+        return
+    with _profile_lock:
+        _profile.dump_stats(filename)
+
+
+# Write metrics to filename; .prom files use Prometheus format, anything else JSON lines
+def export(filename):
+    if filename.endswith(".prom"):
+        write_prometheus(filename)
+    else:
+        write_json_lines(filename)
+    if _profile is not None:
+        write_profile(os.path.splitext(filename)[0] + ".prof")
+
+
+# Turn metrics on from environment variables and export them when the program exits
+def configure_from_env():
+    if os.environ.get("STOCK_METRICS", "") not in ("", "0"):
+        enable(profile=os.environ.get("STOCK_PROFILE", "") not in ("", "0"))
+        filename = os.environ.get("STOCK_METRICS_FILE", "stock_metrics.jsonl")
+        atexit.register(export, os.path.abspath(filename))
+
+configure_from_env()
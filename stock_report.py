@@ -0,0 +1,168 @@
+# Summary: This module streams report rows from the database or the in-memory history to CSV, JSON Lines or the terminal.
+# Rows are produced by generators and written in buffered chunks, so memory use does not grow with history size.
+
+import csv
+import heapq
+import io
+import json
+import stock_data
+import stock_metrics
+from stock_data import DATE_KEY_SQL, date_key
+
+FIELDS = ["symbol", "name", "shares", "date", "open", "high", "low", "close", "adj_close", "volume", "market_value"]
+
+
+def make_row(stock, daily_data):
+    return {"symbol": stock.symbol, "name": stock.name, "shares": stock.shares,
+            "date": daily_data.date.strftime("%Y-%m-%d"), "open": daily_data.open, "high": daily_data.high,
+            "low": daily_data.low, "close": daily_data.close, "adj_close": daily_data.adj_close,
+            "volume": daily_data.volume, "market_value": daily_data.close * stock.shares}
+
+
+def _selected(stock, symbols):
+    return symbols is None or stock.symbol in symbols
+
+
+# Report rows from stocks already in memory (oldest to newest per stock)
+def iter_memory_rows(stock_list, symbols=None, start=None, end=None):
+    for stock in sorted(stock_list, key=lambda x: x.symbol):
+        if _selected(stock, symbols):
+            for daily_data in stock.history(start, end):
+                yield make_row(stock, daily_data)
+
+
+# Daily data for one stock read lazily from rows and blocks, merged in date order
+def _iter_daily(conn, symbol, start, end):
+    dailyDataCmd = "SELECT " + stock_data.daily_columns_sql(conn) + " FROM dailyData WHERE symbol=?"
+    selectValues = [symbol]
+    if start is not None:
+        dailyDataCmd += " AND " + DATE_KEY_SQL + " >= ?"
+        selectValues.append(date_key(start))
+    if end is not None:
+        dailyDataCmd += " AND " + DATE_KEY_SQL + " <= ?"
+        selectValues.append(date_key(end))
+    dailyDataCmd += " ORDER BY " + DATE_KEY_SQL
+    rows = (stock_data.daily_data_from_row(row) for row in conn.execute(dailyDataCmd, selectValues))
+    if not stock_data.has_block_table(conn):
+        yield from rows
+        return
+    blocks = _iter_blocks(conn, symbol, start, end)
+    last = None
+    # blocks first so block data wins for a date found in both, like every other reader
+    for daily_data in heapq.merge(blocks, rows, key=lambda x: x.date):
+        if daily_data.date != last:
+            last = daily_data.date
+            yield daily_data
+
+
+# Decode one yearly block at a time, oldest first
+def _iter_blocks(conn, symbol, start, end):
+    blockCmd = "SELECT data FROM dailyBlocks WHERE symbol=?"
+    selectValues = [symbol]
+    if start is not None:
+        blockCmd += " AND maxDate >= ?"
+        selectValues.append(date_key(start))
+    if end is not None:
+        blockCmd += " AND minDate <= ?"
+        selectValues.append(date_key(end))
+    for row in conn.execute(blockCmd + " ORDER BY minDate;", selectValues):
+        stock_metrics.incr("blocks_decoded")
+        for daily_data in stock_data.decode_block(row[0]):
+            if (start is None or daily_data.date >= start) and (end is None or daily_data.date <= end):
+                yield daily_data
+
+
+# Report rows streamed straight from stocks.db with a read-only connection
+def iter_database_rows(symbols=None, start=None, end=None):
+    conn = stock_data.connect_read_only()
+    try:
+        for stock in stock_data.query_stocks(read_only=True):
+            if _selected(stock, symbols):
+                for daily_data in _iter_daily(conn, stock.symbol, start, end):
+                    yield make_row(stock, daily_data)
+    finally:
+        conn.close()
+
+
+# Base writer: collects formatted text and writes it to the stream every chunk_size rows
+class ReportWriter:
+    def __init__(self, stream, chunk_size=1000):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._buffer = []
+        self._rows = 0
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def format_row(self, row):
+        raise NotImplementedError
+
+    def begin(self):
+        pass
+
+    def write(self, row):
+        self._buffer.append(self.format_row(row))
+        self._rows += 1
+        if len(self._buffer) >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._stream.write("".join(self._buffer))
+            self._buffer.clear()
+        self._stream.flush()
+
+    def end(self):
+        self.flush()
+
+
+class CsvReportWriter(ReportWriter):
+    def __init__(self, stream, chunk_size=1000):
+        super().__init__(stream, chunk_size)
+        self._line = io.StringIO()
+        self._csv = csv.writer(self._line, lineterminator="\n")
+
+    def begin(self):
+        self._stream.write(",".join(FIELDS) + "\n")
+
+    def format_row(self, row):
+        self._line.seek(0)
+        self._line.truncate()
+        self._csv.writerow(["" if row[field] is None else row[field] for field in FIELDS])
+        return self._line.getvalue()
+
+
+class JsonLinesReportWriter(ReportWriter):
+    def format_row(self, row):
+        return json.dumps(row) + "\n"
+
+
+# Tab separated layout like the console report, with a heading each time the symbol changes
+class TerminalReportWriter(ReportWriter):
+    def __init__(self, stream, chunk_size=1000):
+        super().__init__(stream, chunk_size)
+        self._symbol = None
+
+    def format_row(self, row):
+        text = ""
+        if row["symbol"] != self._symbol:
+            self._symbol = row["symbol"]
+            text = f"{row['symbol']}\t{row['name']}\t{row['shares']}\n\tDate\t\tClose\t\tVolume\n\t" + "-" * 40 + "\n"
+        return text + f"\t{row['date']}\t${row['close']:.2f}\t\t{int(row['volume'])}\n"
+
+
+WRITERS = {"csv": CsvReportWriter, "jsonl": JsonLinesReportWriter, "text": TerminalReportWriter}
+
+
+# Write every row from rows to stream in the given format; returns the row count
+@stock_metrics.timed
+def export_report(rows, stream, format="csv", chunk_size=1000):
+    writer = WRITERS[format](stream, chunk_size)
+    writer.begin()
+    for row in rows:
+        writer.write(row)
+    writer.end()
+    stock_metrics.incr("report_rows_exported", writer.rows)
+    return writer.rows
@@ -0,0 +1,246 @@
+# Summary: This module contains an asyncio scheduler that refreshes price history for every stock in the list in the background.
+
+import argparse
+import asyncio
+import csv
+import heapq
+import io
+import signal
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from os import path
+import holidays
+import pytz
+import stock_alerts
+import stock_data
+import stock_metrics
+from stock_class import DailyData
+
+YAHOO_CSV_URL = "https://query1.finance.yahoo.com/v7/finance/download"
+MARKET_TZ = pytz.timezone("America/New_York")
+MARKET_CLOSE = (16, 0)
+
+
+# Token bucket used to rate limit requests to the quote server
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    # Wait until a token is available, then take it
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+# Find the next market close (plus delay) after the given time, skipping weekends and holidays
+def next_market_close(after=None, delay_minutes=15):
+    if after is None:
+        after = datetime.now(MARKET_TZ)
+    elif after.tzinfo is None:
+        after = MARKET_TZ.localize(after)
+    else:
+        after = after.astimezone(MARKET_TZ)
+    market_holidays = holidays.NYSE(years=[after.year, after.year + 1])
+    day = after.date()
+    while True:
+        if day.weekday() < 5 and day not in market_holidays:
+            close = MARKET_TZ.localize(datetime(day.year, day.month, day.day, *MARKET_CLOSE)) + timedelta(minutes=delay_minutes)
+            if close > after:
+                return close
+        day = day + timedelta(days=1)
+
+
+# Parse a Yahoo! Finance history CSV (same layout as import_stock_web_csv) into DailyData
+def parse_history_csv(text):
+    results = []
+    datareader = csv.reader(io.StringIO(text.lstrip("\ufeff")), delimiter=',')
+    next(datareader, None)
+    for row in datareader:
+        try:
+            daily_data = DailyData(datetime.strptime(row[0],"%Y-%m-%d"),float(row[4]),float(row[6]),
+                                   float(row[1]),float(row[2]),float(row[3]),float(row[5]))
+        except (ValueError, IndexError):
+            continue
+        results.append(daily_data)
+    return results
+
+
+# Refreshes all stocks in stock_list on a schedule aligned to market close
+class RefreshScheduler:
+    def __init__(self, stock_list, base_url=YAHOO_CSV_URL, max_concurrency=4, rate=2.0, burst=4,
+                 batch_size=500, lookback_days=365, delay_minutes=15, interval=None, timeout=30, retries=2):
+        self._stock_list = stock_list
+        self._base_url = base_url.rstrip("/")
+        self._max_concurrency = max_concurrency
+        self._bucket = TokenBucket(rate, burst)
+        self._batch_size = batch_size
+        self._lookback_days = lookback_days
+        self._delay_minutes = delay_minutes
+        self._interval = interval  # seconds between runs; None means align to market close
+        self._timeout = timeout
+        self._retries = retries
+        self._pending = []
+        self._stopping = None
+
+    @property
+    def stock_list(self):
+        return self._stock_list
+
+    # Order stocks so the ones with the oldest data are fetched first
+    def stale_order(self):
+        heap = []
+        for i, stock in enumerate(self._stock_list):
+            last = max((d.date for d in stock.DataList), default=datetime.min)
+            heapq.heappush(heap, (last, i, stock))
+        return [heapq.heappop(heap)[2] for _ in range(len(heap))]
+
+    def build_url(self, symbol, start, end):
+        period1 = int(time.mktime(start.timetuple()))
+        period2 = int(time.mktime(end.timetuple()))
+        return f"{self._base_url}/{symbol}?period1={period1}&period2={period2}&interval=1d&events=history"
+
+    def _download(self, url):
+        request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with stock_metrics.span("scheduler_download"):
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:
+                body = response.read()
+        stock_metrics.incr("fetch_bytes_read", len(body))
+        return body.decode("utf-8")
+
+    # Fetch new history for one stock and queue the rows for saving
+    async def refresh_stock(self, stock, semaphore, now):
+        last = max((d.date for d in stock.DataList), default=None)
+        start = last + timedelta(days=1) if last else now - timedelta(days=self._lookback_days)
+        if start > now:
+            return 0
+        url = self.build_url(stock.symbol, start, now)
+        async with semaphore:
+            attempt = 0
+            while True:
+                await self._bucket.acquire()
+                try:
+                    text = await asyncio.to_thread(self._download, url)
+                    break
+                except Exception as e:
+                    if attempt >= self._retries:
+                        print(f"Error retrieving {stock.symbol}: {e}")
+                        stock_metrics.incr("fetch_errors")
+                        return 0
+                    attempt += 1
+                    stock_metrics.incr("fetch_retries")
+                    await asyncio.sleep(2 ** attempt)
+        existing = {d.date for d in stock.DataList}
+        count = 0
+        for daily_data in sorted(parse_history_csv(text), key=lambda x: x.date):
+            if daily_data.date in existing:
+                continue
+            stock.add_data(daily_data)
+            self._pending.append(stock_data.daily_data_values(stock.symbol, daily_data))
+            count += 1
+        stock_metrics.incr("fetch_rows_processed", count)
+        if len(self._pending) >= self._batch_size:
+            await self.flush()
+        return count
+
+    # Write queued rows to the database in one batch
+    async def flush(self):
+        if not self._pending:
+            return 0
+        rows, self._pending = self._pending, []
+        return await asyncio.to_thread(stock_data.save_daily_data_batch, rows)
+
+    # Refresh every stock once, stalest first
+    async def run_once(self, now=None):
+        if now is None:
+            now = datetime.now()
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        tasks = [self.refresh_stock(stock, semaphore, now) for stock in self.stale_order()]
+        counts = await asyncio.gather(*tasks)
+        await self.flush()
+        return sum(counts)
+
+    def next_run_delay(self):
+        if self._interval is not None:
+            return self._interval
+        now = datetime.now(MARKET_TZ)
+        return (next_market_close(now, self._delay_minutes) - now).total_seconds()
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+    # Run forever, refreshing at each scheduled time until stop() is called
+    async def run_forever(self, run_now=True):
+        self._stopping = asyncio.Event()
+        if run_now:
+            count = await self.run_once()
+            print(f"{datetime.now():%Y-%m-%d %H:%M:%S} Refreshed {count} records.")
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.next_run_delay())
+            except asyncio.TimeoutError:
+                count = await self.run_once()
+                print(f"{datetime.now():%Y-%m-%d %H:%M:%S} Refreshed {count} records.")
+
+
+# Run the scheduler headless against the stocks in the database
+def main():
+    parser = argparse.ArgumentParser(description="Refresh stock price history in the background.")
+    parser.add_argument("--base-url", default=YAHOO_CSV_URL)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0, help="requests per second")
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=None, help="seconds between runs (default: after market close)")
+    parser.add_argument("--delay", type=int, default=15, help="minutes after market close to run")
+    parser.add_argument("--once", action="store_true", help="refresh once and exit")
+    args = parser.parse_args()
+
+    if path.exists("stocks.db") == False:
+        stock_data.create_database()
+    stock_list = []
+    stock_data.load_stock_data(stock_list)
+    # refreshed sessions are checked against the alert rules and triggered alerts go to alerts.db
+    stock_alerts.AlertEngine().attach()
+    scheduler = RefreshScheduler(stock_list, base_url=args.base_url, max_concurrency=args.concurrency,
+                                 rate=args.rate, burst=args.burst, batch_size=args.batch_size,
+                                 delay_minutes=args.delay, interval=args.interval)
+
+    async def run():
+        if args.once:
+            count = await scheduler.run_once()
+            print(f"Refreshed {count} records.")
+            return
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, scheduler.stop)
+            except NotImplementedError:
+                pass
+        await scheduler.run_forever()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    # execute only if run as a stand-alone script
+    main()
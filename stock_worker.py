@@ -0,0 +1,148 @@
+# Summary: This module contains a background worker pool so long running data operations do not block the console menu.
+
+import io
+import queue
+import threading
+from datetime import datetime
+
+
+# A unit of background work made up of one or more steps
+class Job:
+    def __init__(self, job_id, description, steps):
+        self._job_id = job_id
+        self._description = description
+        self._steps = steps
+        self._done = 0
+        self._status = "Queued"
+        self._results = []
+        self._error = None
+        self._output = io.StringIO()
+        self._submitted = datetime.now()
+        self._finished = None
+        self._event = threading.Event()
+
+    @property
+    def job_id(self):
+        return self._job_id
+
+    @property
+    def description(self):
+        return self._description
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def total(self):
+        return len(self._steps)
+
+    @property
+    def done(self):
+        return self._done
+
+    @property
+    def results(self):
+        return self._results
+
+    @property
+    def error(self):
+        return self._error
+
+    # Text the job's steps wrote to their output stream
+    @property
+    def output(self):
+        return self._output.getvalue()
+
+    @property
+    def finished(self):
+        return self._event.is_set()
+
+    def progress(self):
+        if self.total == 0:
+            return 100.0
+        return self._done / self.total * 100
+
+    # Block until the job has finished
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+    # Run each step in order, recording results and the first error
+    def run(self):
+        self._status = "Running"
+        try:
+            for step in self._steps:
+                self._results.append(step(self._output))
+                self._done += 1
+            self._status = "Done"
+        except Exception as e:
+            self._error = e
+            self._status = "Failed"
+        finally:
+            self._finished = datetime.now()
+            self._event.set()
+
+    def summary(self):
+        line = f"#{self._job_id} {self._description}: {self._status} ({self._done}/{self.total}, {self.progress():.0f}%)"
+        if self._error is not None:
+            line += f" - {self._error}"
+        return line
+
+
+# Pool of worker threads that take jobs from a queue
+class BackgroundWorker:
+    def __init__(self, workers=2):
+        self._queue = queue.Queue()
+        self._jobs = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"stock-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            job.run()
+            self._queue.task_done()
+
+    # Queue a job; steps is a list of callables run one after another. Each step is called with the job's
+    # output stream so messages are kept with the job instead of being printed over the menu.
+    def submit(self, description, steps):
+        with self._lock:
+            job = Job(self._next_id, description, list(steps))
+            self._next_id += 1
+            self._jobs.append(job)
+        self._queue.put(job)
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def active_jobs(self):
+        return [job for job in self.jobs() if not job.finished]
+
+    # Remove finished jobs from the job list and return them
+    def clear_finished(self):
+        with self._lock:
+            finished = [job for job in self._jobs if job.finished]
+            self._jobs = [job for job in self._jobs if not job.finished]
+        return finished
+
+    # Wait for all queued jobs to finish
+    def wait_all(self):
+        self._queue.join()
+
+    # Stop the worker threads once the queue is drained
+    def shutdown(self, wait=True):
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -1,9 +1,15 @@
 # Summary: This module is just a shorter name for the program that can start either the Console or GUI version of the program.
 
+import sys
 import stock_console
+import stock_batch
 # import stock_GUI
 
 def main():
+    # Batch commands (import, fetch, save, report, chart) run without the menu
+    if len(sys.argv) > 1:
+        sys.exit(stock_batch.main(sys.argv[1:]))
+
     #For Console Version
     stock_console.main()
 
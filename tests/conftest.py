@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the stock modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
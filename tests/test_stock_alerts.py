@@ -0,0 +1,54 @@
+import os
+from datetime import datetime
+import pytest
+import stock_alerts
+import stock_data
+from stock_class import Stock, DailyData
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = stock_alerts.AlertEngine(str(tmp_path / "alerts.db"))
+    engine.attach()
+    yield engine
+    engine.detach()
+
+
+def test_reimport_of_held_sessions_does_not_alert(engine):
+    stock = Stock("AAPL", "Apple", 10)
+    stock.add_data(DailyData(datetime(2025, 5, 1), 213.32, 1000), notify=False)
+    stock.add_data(DailyData(datetime(2025, 5, 2), 205.35, 1000), notify=False)
+    engine.add_rule("AAPL", "move", 3)
+
+    # the same sessions arrive again, newest first, in a new process
+    stock.add_data(DailyData(datetime(2025, 5, 2), 205.35, 1000))
+    stock.add_data(DailyData(datetime(2025, 5, 1), 213.32, 1000))
+    assert engine.unseen == 0
+
+    stock.add_data(DailyData(datetime(2025, 5, 5), 195.00, 1000))
+    assert [alert["message"] for alert in stock_alerts.query_alerts(filename=engine.filename)] == ["AAPL moved -5.04% to $195.00"]
+
+
+def test_price_rules_fire_on_crossing(engine):
+    stock = Stock("V", "Visa", 5)
+    engine.add_rule("V", "below", 300)
+    for day, close in enumerate([310, 295, 290, 305, 299], start=1):
+        stock.add_data(DailyData(datetime(2025, 6, day), close, 1000))
+    assert [alert["date"] for alert in stock_alerts.query_alerts(filename=engine.filename)] == ["06/05/25", "06/02/25"]
+
+
+def test_newest_first_csv_import_checks_each_day_against_the_day_before(engine):
+    csv_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "AAPL.csv")
+    held = Stock("AAPL", "Apple", 10)
+    stock_data.import_stock_web_csv([held], "AAPL", csv_file)
+    stock = Stock("AAPL", "Apple", 10)
+    for daily_data in held.history(end="04/25/25"):
+        stock.add_data(daily_data, notify=False)
+    engine.add_rule("AAPL", "move", 3)
+
+    stock_data.import_stock_web_csv([stock], "AAPL", csv_file)
+    messages = [alert["message"] for alert in stock_alerts.query_alerts(filename=engine.filename)]
+    assert messages == ["AAPL moved -3.74% to $205.35"]
+
+    stock_data.import_stock_web_csv([stock], "AAPL", csv_file)  # re-import: nothing new
+    assert engine.unseen == 1
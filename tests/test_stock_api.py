@@ -0,0 +1,23 @@
+import stock_api
+
+
+def test_put_after_invalidate_is_dropped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = stock_api.ResponseCache()
+    entry, generation = cache.get("/stocks?")
+    assert entry is None
+    cache.invalidate()  # data saved while the response was being built
+    cache.put("/stocks?", ("etag", b"old"), generation)
+    assert cache.get("/stocks?")[0] is None
+
+
+def test_put_after_file_change_is_dropped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = stock_api.ResponseCache()
+    _, generation = cache.get("/stocks?")
+    (tmp_path / "stocks.db").write_bytes(b"changed")
+    _, newer = cache.get("/quotes?")  # another request sees the new version
+    cache.put("/stocks?", ("etag", b"old"), generation)
+    cache.put("/quotes?", ("etag", b"new"), newer)
+    assert cache.get("/stocks?")[0] is None
+    assert cache.get("/quotes?")[0] == ("etag", b"new")
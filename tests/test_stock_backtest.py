@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+import stock_backtest
+from stock_backtest import MarketData
+
+
+def make_data(closes):
+    closes = np.array(closes, dtype=float)
+    dates = [datetime(2024, 1, 1) + timedelta(days=i) for i in range(closes.shape[0])]
+    symbols = [f"S{j}" for j in range(closes.shape[1])]
+    return MarketData(dates, symbols, closes, np.ones(closes.shape))
+
+
+def test_forward_fill_carries_last_price():
+    values = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [4.0, 5.0]])
+    filled = stock_backtest.forward_fill(values)
+    np.testing.assert_array_equal(filled, [[np.nan, 1.0], [2.0, 1.0], [2.0, 1.0], [4.0, 5.0]])
+
+
+def test_moving_average_waits_for_a_full_window():
+    values = np.array([[1.0], [2.0], [3.0], [4.0]])
+    np.testing.assert_array_equal(stock_backtest.moving_average(values, 2), [[np.nan], [1.5], [2.5], [3.5]])
+    np.testing.assert_array_equal(stock_backtest.moving_average(np.array([[np.nan], [2.0], [4.0]]), 2), [[np.nan], [np.nan], [3.0]])
+
+
+def test_buy_and_hold_without_costs():
+    data = make_data([[10], [10], [12], [15]])
+    result = stock_backtest.simulate(data, np.ones((4, 1)), cash=1000, cost_bps=0)
+    # weights decided on day 0 trade on day 1: 100 shares at $10
+    np.testing.assert_array_equal(result.positions[:, 0], [0, 100, 100, 100])
+    np.testing.assert_allclose(result.equity, [1000, 1000, 1200, 1500])
+    assert result.trades == 1
+    assert result.summary()["total_return"] == pytest.approx(0.5)
+
+
+def test_buy_and_hold_with_costs_keeps_cash_positive():
+    data = make_data([[10], [10], [12], [15]])
+    result = stock_backtest.simulate(data, np.ones((4, 1)), cash=1000, cost_bps=100)
+    # $1000 less the 1% cost of the order buys 99 shares ($990 + $9.90 cost), leaving $0.10
+    np.testing.assert_array_equal(result.positions[:, 0], [0, 99, 99, 99])
+    np.testing.assert_allclose(result.equity, [1000, 990.1, 1188.1, 1485.1])
+    assert result.costs == pytest.approx(9.9)
+
+
+def test_sweep_runs_every_combination():
+    data = make_data([[10, 20], [11, 19], [12, 21], [11, 22], [13, 20], [14, 23]])
+    results = stock_backtest.sweep(data, "momentum", {"lookback": [1, 2], "top": [1]}, workers=2, cost_bps=0)
+    assert [params for params, _ in results] == [{"lookback": 1, "top": 1}, {"lookback": 2, "top": 1}]
+    for params, summary in results:
+        assert summary == stock_backtest.run_backtest(data, "momentum", params, cost_bps=0)
+
+
+@pytest.mark.parametrize("signal, params", [("momentum", {"lookback": 0}), ("equal_weight", {"every": 0}),
+                                            ("ma_crossover", {"fast": 0})])
+def test_bad_parameters_raise_value_error(signal, params):
+    with pytest.raises(ValueError):
+        stock_backtest.run_backtest(make_data([[10], [11]]), signal, params)
@@ -0,0 +1,31 @@
+import shutil
+import os
+import stock_batch
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(*argv):
+    return stock_batch.main(["--json", *argv])
+
+
+def test_portfolio_keeps_relative_paths(tmp_path, monkeypatch, capsys):
+    (tmp_path / "p").mkdir()
+    shutil.copy(os.path.join(REPO, "V.csv"), tmp_path / "V.csv")
+    monkeypatch.chdir(tmp_path)
+    assert run("--portfolio", "p", "save", "--stock", "V", "Visa", "5") == 0
+    monkeypatch.chdir(tmp_path)
+    assert run("--portfolio", str(tmp_path / "p"), "import", "V", "V.csv") == 0
+    assert os.path.exists(tmp_path / "p" / "stocks.db")
+    assert '"event": "import"' in capsys.readouterr().out
+
+
+def test_reimport_reports_rows_saved(tmp_path, monkeypatch, capsys):
+    shutil.copy(os.path.join(REPO, "V.csv"), tmp_path / "V.csv")
+    monkeypatch.chdir(tmp_path)
+    assert run("save", "--stock", "V", "Visa", "5") == 0
+    assert run("import", "V", "V.csv") == 0
+    assert run("import", "V", "V.csv") == 0
+    records = [line for line in capsys.readouterr().out.splitlines() if '"event": "import"' in line]
+    assert '"records": 0' not in records[0]
+    assert '"records": 0' in records[1]
@@ -0,0 +1,31 @@
+from datetime import date, datetime
+from stock_class import Stock, DailyData
+
+
+def make_stock(days):
+    stock = Stock("AAPL", "Apple", 10)
+    for day in days:
+        stock.add_data(DailyData(datetime(2024, 1, day), float(day), 1000), notify=False)
+    return stock
+
+
+def test_history_range_accepts_date_types():
+    stock = make_stock([5, 2, 9, 3])
+    assert [d.close for d in stock.history(datetime(2024, 1, 3), "01/05/24")] == [3.0, 5.0]
+    assert [d.close for d in stock.history(date(2024, 1, 6))] == [9.0]
+    assert [d.close for d in stock.last(2)] == [5.0, 9.0]
+
+
+def test_history_is_not_changed_by_later_data():
+    stock = make_stock([2, 3])
+    history = stock.history()
+    stock.add_data(DailyData(datetime(2024, 1, 1), 1.0, 1000), notify=False)  # forces a re-sort
+    assert [d.close for d in history] == [2.0, 3.0]
+    assert [d.close for d in stock.history()] == [1.0, 2.0, 3.0]
+
+
+def test_replaced_data_list_is_sorted_again():
+    stock = make_stock([1, 2, 3])
+    assert len(stock.history()) == 3
+    stock.DataList = list(reversed(stock.DataList))
+    assert [d.close for d in stock.history("01/02/24", "01/03/24")] == [2.0, 3.0]
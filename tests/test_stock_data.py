@@ -0,0 +1,45 @@
+from datetime import date, datetime
+import pytest
+import stock_data
+import stock_report
+from stock_class import Stock, DailyData
+
+
+@pytest.fixture
+def portfolio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stock_data.create_database()
+    return tmp_path
+
+
+def make_stock(close):
+    stock = Stock("AAPL", "Apple", 10)
+    stock.add_data(DailyData(datetime(2024, 1, 2), close, 1000))
+    return stock
+
+
+def test_rows_save_after_blocks_save_keeps_block_value(portfolio):
+    stock_data.save_stock_data([make_stock(10.0)], storage="blocks")
+    stock_data.save_stock_data([make_stock(20.0)], storage="rows")
+
+    loaded = []
+    stock_data.load_stock_data(loaded)
+    queried = stock_data.query_stock_data("AAPL")
+    exported = list(stock_report.iter_database_rows())
+    weekly = stock_data.query_rollup("AAPL", "weekly")
+    assert [d.close for d in loaded[0].DataList] == [10.0]
+    assert [d.close for d in queried] == [10.0]
+    assert [row["close"] for row in exported] == [10.0]
+    assert [bar.close for bar in weekly] == [10.0]
+
+
+
+@pytest.mark.parametrize("start", [datetime(2024, 1, 2), date(2024, 1, 2), "01/02/24"])
+def test_query_stock_data_accepts_history_date_types(portfolio, start):
+    stock_data.save_stock_data([make_stock(10.0)], storage="blocks")
+    assert [d.close for d in stock_data.query_stock_data("AAPL", start, start)] == [10.0]
+
+
+def test_query_rollup_accepts_history_date_types(portfolio):
+    stock_data.save_stock_data([make_stock(10.0)])
+    assert [bar.close for bar in stock_data.query_rollup("AAPL", "monthly", date(2024, 1, 1), "01/31/24")] == [10.0]
@@ -0,0 +1,92 @@
+import pytest
+import stock_data
+from stock_class import Stock
+from stock_journal import TradeJournal
+
+
+@pytest.fixture
+def portfolio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stock_data.create_database()
+    return tmp_path
+
+
+def open_journal():
+    return TradeJournal(sync_every=1, sync_interval=60)
+
+
+def load_and_replay():
+    stock_list = []
+    stock_data.load_stock_data(stock_list)
+    journal = open_journal()
+    journal.replay(stock_list)
+    journal.close()
+    return {stock.symbol: stock.shares for stock in stock_list}
+
+
+def test_replay_applies_unsaved_trades_once(portfolio):
+    stock_list = [Stock("AAPL", "Apple", 0)]
+    journal = open_journal()
+    journal.trade(stock_list[0], "buy", 100)
+    journal.trade(stock_list[0], "sell", 30)
+    journal.close()  # crash: nothing saved to stocks.db
+
+    assert load_and_replay() == {"AAPL": 70}
+
+
+def test_crash_between_save_and_compact(portfolio, monkeypatch):
+    stock_list = [Stock("AAPL", "Apple", 0)]
+    journal = open_journal()
+    journal.trade(stock_list[0], "buy", 100)
+
+    def crash(stock_list):
+        raise RuntimeError("crash before compact")
+    monkeypatch.setattr(journal, "compact", crash)
+    with pytest.raises(RuntimeError):
+        journal.save(stock_list)
+    journal.close()
+
+    assert load_and_replay() == {"AAPL": 100}
+
+
+def test_overwrite_save_keeps_journal_position(portfolio):
+    stock_list = [Stock("AAPL", "Apple", 0)]
+    journal = open_journal()
+    journal.trade(stock_list[0], "buy", 100)
+    journal.compact(stock_list)
+    journal.trade(stock_list[0], "buy", 5)
+    journal.close()
+
+    # a save without the journal (as the batch commands do) of the shares loaded from the database
+    loaded = []
+    stock_data.load_stock_data(loaded)
+    stock_data.save_stock_data(loaded, overwrite=True)
+
+    assert load_and_replay() == {"AAPL": 105}
+
+
+def test_torn_last_line_is_ignored(portfolio):
+    stock_list = [Stock("AAPL", "Apple", 0)]
+    journal = open_journal()
+    journal.trade(stock_list[0], "buy", 10)
+    journal.close()
+    with open(journal.filename, "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "symbol": "AAPL", "si')
+
+    assert load_and_replay() == {"AAPL": 10}
+
+
+def test_trade_after_torn_line_is_replayed(portfolio):
+    stock_list = [Stock("AAPL", "Apple", 0)]
+    journal = open_journal()
+    journal.trade(stock_list[0], "buy", 10)
+    journal.compact(stock_list)
+    journal.close()
+    with open(journal.filename, "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "symbol": "AAPL", "si')
+
+    journal = open_journal()
+    journal.trade(stock_list[0], "buy", 5)
+    journal.close()
+
+    assert load_and_replay() == {"AAPL": 15}
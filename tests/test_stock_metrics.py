@@ -0,0 +1,65 @@
+import json
+import pytest
+import stock_metrics
+
+
+@pytest.fixture
+def metrics():
+    stock_metrics.reset()
+    stock_metrics.enable()
+    yield stock_metrics
+    stock_metrics.disable()
+    stock_metrics.reset()
+
+
+@stock_metrics.timed
+def load_rows():
+    stock_metrics.incr("rows_processed", 3)
+    return "loaded"
+
+
+def test_disabled_metrics_record_nothing():
+    stock_metrics.disable()
+    stock_metrics.reset()
+    stock_metrics.incr("rows_processed")
+    with stock_metrics.span("save"):
+        pass
+    assert load_rows() == "loaded"
+    assert stock_metrics.snapshot() == {"spans": {}, "counters": {}}
+
+
+def test_span_and_counter_totals(metrics):
+    for _ in range(2):
+        with metrics.span("save"):
+            metrics.incr("rows_processed")
+    assert load_rows() == "loaded"
+    data = metrics.snapshot()
+    assert data["counters"] == {"rows_processed": 5}
+    assert data["spans"]["save"]["calls"] == 2
+    assert data["spans"]["load_rows"]["calls"] == 1
+    assert 0 <= data["spans"]["save"]["max_seconds"] <= data["spans"]["save"]["seconds"]
+
+
+def test_export_json_lines(metrics, tmp_path):
+    with metrics.span("save"):
+        metrics.incr("rows_processed", 2)
+    filename = tmp_path / "metrics.jsonl"
+    metrics.export(str(filename))
+    metrics.export(str(filename))  # appends
+    records = [json.loads(line) for line in filename.read_text().splitlines()]
+    assert [(r["type"], r["name"]) for r in records] == [("span", "save"), ("counter", "rows_processed")] * 2
+    assert records[0]["calls"] == 1 and "seconds" in records[0] and "time" in records[0]
+    assert records[1]["value"] == 2
+
+
+def test_export_prometheus(metrics, tmp_path):
+    with metrics.span("api quotes"):
+        metrics.incr("api_cache_hits", 4)
+    filename = tmp_path / "metrics.prom"
+    metrics.export(str(filename))
+    lines = filename.read_text().splitlines()
+    assert "# TYPE stock_span_calls_total counter" in lines
+    assert 'stock_span_calls_total{span="api quotes"} 1' in lines
+    assert any(line.startswith('stock_span_seconds_total{span="api quotes"} ') for line in lines)
+    assert "# TYPE stock_api_cache_hits_total counter" in lines
+    assert "stock_api_cache_hits_total 4" in lines
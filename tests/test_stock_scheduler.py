@@ -0,0 +1,82 @@
+import asyncio
+import functools
+import sqlite3
+import threading
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import stock_data
+from stock_class import Stock, DailyData
+from stock_scheduler import RefreshScheduler
+
+CSV_HEADER = "Date,Open,High,Low,Close,Adj Close,Volume\n"
+CSV_DATES = ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-08"]
+
+
+# Local stand-in for the quote server: serves quotes/<SYMBOL> and records the symbols requested in order
+@pytest.fixture
+def quote_server(tmp_path):
+    quotes = tmp_path / "quotes"
+    quotes.mkdir()
+    for symbol in ("AAA", "BBB", "CCC"):
+        rows = [f"{day},10,11,9,{10 + i},{10 + i},1000\n" for i, day in enumerate(CSV_DATES)]
+        (quotes / symbol).write_text(CSV_HEADER + "".join(rows))
+    requested = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requested.append(self.path.split("?")[0].strip("/"))
+            super().do_GET()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(quotes)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", requested
+    server.shutdown()
+    server.server_close()
+
+
+def make_stock(symbol, days):
+    stock = Stock(symbol, symbol, 1)
+    for day in days:
+        stock.add_data(DailyData(datetime.strptime(day, "%Y-%m-%d"), 1.0, 1), notify=False)
+    return stock
+
+
+def test_run_once_fetches_stalest_first_and_saves_in_batches(tmp_path, monkeypatch, quote_server):
+    monkeypatch.chdir(tmp_path)
+    stock_data.create_database()
+    base_url, requested = quote_server
+    batches = []
+    save_batch = stock_data.save_daily_data_batch
+    def record_batch(rows):
+        batches.append(len(rows))
+        return save_batch(rows)
+    monkeypatch.setattr(stock_data, "save_daily_data_batch", record_batch)
+
+    stock_list = [make_stock("CCC", ["2024-01-04", "2024-01-05"]),
+                  make_stock("AAA", ["2024-01-02", "2024-01-03"]),
+                  make_stock("BBB", [])]
+    scheduler = RefreshScheduler(stock_list, base_url=base_url, max_concurrency=1, rate=100, burst=10, batch_size=4)
+    count = asyncio.run(scheduler.run_once(now=datetime(2024, 1, 10)))
+
+    assert requested == ["BBB", "AAA", "CCC"]
+    assert count == 5 + 3 + 3
+    assert batches == [5, 6]
+    conn = sqlite3.connect("stocks.db")
+    saved = dict(conn.execute("SELECT symbol, COUNT(*) FROM dailyData GROUP BY symbol;").fetchall())
+    conn.close()
+    assert saved == {"AAA": 3, "BBB": 5, "CCC": 3}
+    assert [len(stock.DataList) for stock in stock_list] == [5, 5, 5]
+
+
+def test_run_once_skips_stocks_that_are_up_to_date(tmp_path, monkeypatch, quote_server):
+    monkeypatch.chdir(tmp_path)
+    stock_data.create_database()
+    base_url, requested = quote_server
+    scheduler = RefreshScheduler([make_stock("AAA", ["2024-01-10"])], base_url=base_url)
+    assert asyncio.run(scheduler.run_once(now=datetime(2024, 1, 10))) == 0
+    assert requested == []
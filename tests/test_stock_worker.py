@@ -0,0 +1,18 @@
+import sys
+from stock_worker import BackgroundWorker
+
+
+def test_job_output_is_kept_with_the_job(capsys):
+    stdout = sys.stdout
+    worker = BackgroundWorker(workers=1)
+    try:
+        job = worker.submit("Noisy", [lambda output: print("Skipping row.", file=output) or 1,
+                                      lambda output: print("Skipping row.", file=output) or 2])
+        job.wait(5)
+        print("menu text")
+        assert job.results == [1, 2]
+        assert job.output == "Skipping row.\nSkipping row.\n"
+        assert capsys.readouterr().out == "menu text\n"
+        assert sys.stdout is stdout
+    finally:
+        worker.shutdown()
@@ -1,6 +1,7 @@
 #Helper Functions
 
 import matplotlib.pyplot as plt
+import stock_metrics
 
 from os import system, name
 
@@ -20,10 +21,25 @@ def sortStocks(stock_list):
 # Function to sort the daily stock data (oldest to newest) for all stocks
 def sortDailyData(stock_list):
     for stock in stock_list:
-        stock.DataList.sort(key=lambda x: x.date)
+        with stock.lock:
+            stock.DataList.sort(key=lambda x: x.date)
+
+# Function to summarize one stock (same figures as the console report)
+def report_summary(stock):
+    history = list(reversed(stock.last(2)))
+    current_price = history[0].close if len(history) > 0 else 0
+    row = {"symbol": stock.symbol, "name": stock.name, "shares": stock.shares,
+           "current": current_price, "market_value": current_price * stock.shares,
+           "date": history[0].date.strftime("%Y-%m-%d") if len(history) > 0 else None}
+    if len(history) > 1:
+        prev_price = history[1].close
+        row["previous_close"] = prev_price
+        row["change"] = current_price - prev_price
+        row["percent"] = (current_price - prev_price) / prev_price * 100
+    return row
 
 # Function to create stock chart
-def display_stock_chart(stock_list,symbol):
+def display_stock_chart(stock_list,symbol,sessions=None):
     selected_stock = None
     for stock in stock_list:
         if stock.symbol == symbol:
@@ -34,31 +50,32 @@ def display_stock_chart(stock_list,symbol):
         print(f"No data available for {symbol}")
         return
     
-    # Sort data from oldest to newest
-    chart_data = sorted(selected_stock.DataList, key=lambda x: x.date)
+    with stock_metrics.span("display_stock_chart"):
+        # Data from oldest to newest, optionally only the most recent sessions
+        chart_data = selected_stock.history() if sessions is None else selected_stock.last(sessions)
     
-    dates = [data.date for data in chart_data]
-    prices = [data.close for data in chart_data]
-    volumes = [data.volume for data in chart_data]
+        dates = [data.date for data in chart_data]
+        prices = [data.close for data in chart_data]
+        volumes = [data.volume for data in chart_data]
     
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), gridspec_kw={'height_ratios': [3, 1]})
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), gridspec_kw={'height_ratios': [3, 1]})
     
-    # Plot price data
-    ax1.plot(dates, prices, color='#1f77b4', linewidth=2, marker='o', markersize=4)
-    ax1.fill_between(dates, prices, color='#1f77b4', alpha=0.1)
-    ax1.set_title(f'{selected_stock.name} ({symbol}) - Price History', fontsize=16, fontweight='bold')
-    ax1.set_ylabel('Price ($)', fontsize=12)
-    ax1.grid(True, linestyle='--', alpha=0.6)
+        # Plot price data
+        ax1.plot(dates, prices, color='#1f77b4', linewidth=2, marker='o', markersize=4)
+        ax1.fill_between(dates, prices, color='#1f77b4', alpha=0.1)
+        ax1.set_title(f'{selected_stock.name} ({symbol}) - Price History', fontsize=16, fontweight='bold')
+        ax1.set_ylabel('Price ($)', fontsize=12)
+        ax1.grid(True, linestyle='--', alpha=0.6)
     
-    # Plot volume data
-    ax2.bar(dates, volumes, color='#2ca02c', alpha=0.6)
-    ax2.set_ylabel('Volume', fontsize=12)
-    ax2.set_xlabel('Date', fontsize=12)
-    ax2.grid(True, linestyle='--', alpha=0.6)
+        # Plot volume data
+        ax2.bar(dates, volumes, color='#2ca02c', alpha=0.6)
+        ax2.set_ylabel('Volume', fontsize=12)
+        ax2.set_xlabel('Date', fontsize=12)
+        ax2.grid(True, linestyle='--', alpha=0.6)
     
-    plt.tight_layout()
+        plt.tight_layout()
     
-    if len(dates) > 10:
-        plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
+        if len(dates) > 10:
+            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
     
     plt.show()
\ No newline at end of file